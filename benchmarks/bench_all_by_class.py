@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""Benchmarks FileStorage.all(cls) against a full isinstance scan
+
+Usage: ./benchmarks/bench_all_by_class.py [number_of_objects]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import storage  # noqa: E402
+from models.amenity import Amenity  # noqa: E402
+from models.city import City  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.state import State  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def scan(cls):
+    """The pre-index implementation of all(cls)"""
+    return {k: v for k, v in storage.all().items() if isinstance(v, cls)}
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    mix = [(Review, 50), (Place, 25), (User, 15), (City, 7),
+           (Amenity, 2), (State, 1)]
+    storage.all().clear()
+    for cls, share in mix:
+        for _ in range(total * share // 100):
+            storage.new(cls())
+    print("{} objects in storage".format(len(storage.all())))
+    for cls, _ in mix:
+        runs = 20
+        indexed = timeit.timeit(lambda: storage.all(cls), number=runs)
+        scanned = timeit.timeit(lambda: scan(cls), number=runs)
+        print("all({:<7}) {:>6} objs  indexed {:8.3f} ms"
+              "  scan {:8.3f} ms".format(cls.__name__, len(storage.all(cls)),
+                                         indexed / runs * 1000,
+                                         scanned / runs * 1000))
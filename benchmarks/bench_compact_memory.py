@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""Reports the memory FileStorage holds per reloaded object in each mode
+
+Usage: ./benchmarks/bench_compact_memory.py [number_of_reviews]
+
+Modes: models (the default), HBNB_FILE_LAZY=1 dicts and
+HBNB_FILE_COMPACT=1 tuples. Reviews share a handful of places and users,
+as they would in a real store.
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def reloaded_bytes(env):
+    """Returns the bytes held after reloading file.json with env set"""
+    os.environ.pop('HBNB_FILE_LAZY', None)
+    os.environ.pop('HBNB_FILE_COMPACT', None)
+    os.environ.update(env)
+    storage = FileStorage()
+    storage.all().clear()
+    gc.collect()
+    tracemalloc.start()
+    storage.reload()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    storage.all().clear()
+    return size
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    os.chdir(tempfile.mkdtemp())
+    storage = FileStorage()
+    for i in range(total):
+        storage.new(Review(text="Great stay", place_id="place-{}".format(
+            i % 100), user_id="user-{}".format(i % 1000)))
+    storage.save()
+    storage.all().clear()
+    for name, env in (("models", {}), ("lazy dicts", {'HBNB_FILE_LAZY': '1'}),
+                      ("compact", {'HBNB_FILE_COMPACT': '1'})):
+        print("{:<10} {:5.0f} bytes/object".format(
+            name, reloaded_bytes(env) / total))
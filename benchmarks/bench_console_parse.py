@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""Benchmarks the console's line parsing against the eval/shlex parsing
+
+Replays a scripted session of dot calls, update dictionaries and create
+parameters through the parsers only (nothing is stored), and reports the
+cost per line of the current parsers and of the previous implementation,
+copied below.
+
+Usage: ./benchmarks/bench_console_parse.py [number_of_lines]
+"""
+import os
+import re
+import shlex
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from console import parse_dot_call, parse_literal, parse_params  # noqa: E402
+
+SESSION = [
+    'User.show("2f4d5c1e-8b1a-4c55-9a3e-6f0b2d1c9e77")',
+    'Place.update("2f4d5c1e-8b1a-4c55-9a3e-6f0b2d1c9e77", '
+    '{"name": "Loft", "max_guest": 4, "latitude": 37.77})',
+    'User.update("2f4d5c1e-8b1a-4c55-9a3e-6f0b2d1c9e77", "first_name", '
+    '"Ann")',
+    'create Place city_id="0001" user_id="0001" name="My_little_house" '
+    'number_rooms=4 price_by_night=300 latitude=37.773972',
+    'State.count()',
+]
+
+
+def legacy_dot_call(line):
+    """The previous precmd(): partition by hand, eval the dict"""
+    pline = line[line.find('(') + 1:line.find(')')]
+    _args = ''
+    pline = pline.partition(', ')
+    _id = pline[0].replace('"', '')
+    pline = pline[2].strip()
+    if pline:
+        if pline[0] == '{' and pline[-1] == '}' and \
+                type(eval(pline)) is dict:
+            _args = pline
+            eval(_args)  # and again in do_update
+        else:
+            _args = pline.replace(',', '')
+    return ' '.join([line[line.find('.') + 1:line.find('(')],
+                     line[:line.find('.')], _id, _args])
+
+
+def legacy_params(args):
+    """The previous do_create(): a regex scan, then shlex.split()"""
+    quoted = {m.group(1) for m in re.finditer(r'(\w+)="[^"]*"', args)}
+    return [(key, value, key in quoted) for key, _, value in
+            (word.partition('=') for word in shlex.split(args)[1:])]
+
+
+def current_dot_call(line):
+    """parse_dot_call(), then the one parse do_update makes of a dict"""
+    line = parse_dot_call(line)
+    text = line.split(' ', 3)[3]
+    if text.startswith('{'):
+        parse_literal(text)
+    return line
+
+
+def replay(lines, dot_call, params):
+    """Parses every line the way the console would"""
+    for line in lines:
+        if line.startswith('create '):
+            params(line[7:])
+        else:
+            dot_call(line)
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lines = (SESSION * (total // len(SESSION) + 1))[:total]
+    old = timeit.timeit(lambda: replay(lines, legacy_dot_call,
+                                       legacy_params), number=1)
+    new = timeit.timeit(lambda: replay(lines, current_dot_call,
+                                       parse_params), number=1)
+    print("{} lines  eval/shlex {:6.2f} s ({:.2f} us/line)  "
+          "parsers {:6.2f} s ({:.2f} us/line)  ({:.1f}x)".format(
+              total, old, old / total * 1e6, new, new / total * 1e6,
+              old / new))
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""Benchmarks FileStorage.save() when a small share of objects changed
+
+Usage: ./benchmarks/bench_dirty_save.py [number_of_objects] [changed_ratio]
+
+Each round changes changed_ratio of the objects and saves, once with the
+encoded member cache (the default) and once with HBNB_FILE_CACHE=0.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def timed_saves(storage, objs, changed, rounds=3):
+    """Returns the best time of rounds saves after changing some objects"""
+    best = None
+    for _ in range(rounds):
+        for obj in random.sample(objs, changed):
+            obj.text = "Edited"
+        start = time.perf_counter()
+        storage.save()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    changed = max(1, int(total * ratio))
+    os.chdir(tempfile.mkdtemp())
+    storage = FileStorage()
+    objs = []
+    for _ in range(total):
+        obj = Review(text="Great", place_id="p", user_id="u")
+        storage.new(obj)
+        objs.append(obj)
+    storage.save()
+    cached = timed_saves(storage, objs, changed)
+    os.environ['HBNB_FILE_CACHE'] = '0'
+    full = timed_saves(FileStorage(), objs, changed)
+    print("{} objects, {} changed per save".format(total, changed))
+    print("full re-encode {:6.2f} s".format(full))
+    print("dirty only     {:6.2f} s  ({:.1f}x)".format(cached, full / cached))
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+"""Benchmarks Model.from_storage() against Model(**record)
+
+Usage: ./benchmarks/bench_from_storage.py [number_of_records]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for cls, attrs in ((Review, {'text': "Great", 'place_id': "p",
+                                 'user_id': "u"}),
+                       (Place, {'name': "Loft", 'city_id': "c",
+                                'user_id': "u", 'number_rooms': 2,
+                                'latitude': 1.5})):
+        record = cls(**attrs).to_dict()
+        records = [dict(record) for _ in range(total)]
+        init = timeit.timeit(lambda: [cls(**r) for r in records], number=1)
+        records = [dict(record) for _ in range(total)]
+        fast = timeit.timeit(lambda: [cls.from_storage(r) for r in records],
+                             number=1)
+        print("{:<7} {} records  __init__ {:6.2f} s  from_storage {:6.2f} s"
+              "  ({:.1f}x)".format(cls.__name__, total, init, fast,
+                                   init / fast))
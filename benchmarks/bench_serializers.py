@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""Benchmarks FileStorage save() and reload() for each file format
+
+Usage: ./benchmarks/bench_serializers.py [number_of_objects ...]
+(defaults to 10000 100000 1000000)
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.engine.serializers import SERIALIZERS  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def populate(storage, total):
+    """Fills storage with total Places and Reviews"""
+    storage.all().clear()
+    for i in range(total):
+        if i % 2:
+            storage.new(Review(text="Great stay #{}".format(i),
+                               place_id="p", user_id="u"))
+        else:
+            storage.new(Place(name="Place #{}".format(i), city_id="c",
+                              user_id="u", number_rooms=i % 5,
+                              latitude=1.5, longitude=-2.25))
+
+
+def timed(func):
+    """Returns how long func() took, in seconds"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    # never touch the file.json of the current directory
+    os.chdir(tempfile.mkdtemp())
+    for total in sizes:
+        for name in SERIALIZERS:
+            os.environ['HBNB_FILE_FORMAT'] = name
+            try:
+                storage = FileStorage()
+            except ImportError as e:
+                print("{:>8} {:<8} skipped: {}".format(total, name, e))
+                continue
+            populate(storage, total)
+            save = timed(storage.save)
+            size = os.path.getsize('file.json')
+            reload = timed(storage.reload)
+            print("{:>8} {:<8} save {:7.2f} s  reload {:7.2f} s  "
+                  "{:7.1f} MB".format(total, name, save, reload,
+                                      size / 1e6))
+            os.remove('file.json')
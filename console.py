@@ -1,10 +1,18 @@
 #!/usr/bin/python3
 """ Console Module """
+import argparse
+import ast
 import cmd
+import csv
+import json
 import sys
 import shlex  # Import shlex for robust argument splitting
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from io import StringIO
 from models.base_model import BaseModel
-from models.__init__ import storage
+from models import storage, storage_type
 from models.user import User
 from models.place import Place
 from models.state import State
@@ -14,6 +22,133 @@ from models.review import Review
 from sqlalchemy.exc import IntegrityError
 import re
 
+# <class>.<command>(<args>): the dot syntax rewritten by precmd()
+_DOT_CALL = re.compile(r'([^.(]*)\.(\w+)\((.*)\)')
+# the first argument of a dot call, quoted or not, and the rest
+_DOT_ARGS = re.compile(r'\s*(?:"([^"]*)"|([^,]*?))\s*(?:,\s*(.*?))?\s*$')
+# a create parameter: key="quoted value" or key=bare_value, or any
+# other word, which create skips
+_PARAM = re.compile(r'(\w+)=(?:"((?:[^"\\]|\\.)*)"|([^\s"]*))(?!\S)'
+                    r'|"(?:[^"\\]|\\.)*"(?!\S)|(\S+)')
+# one token of a literal: a string, a number, a name or punctuation
+_TOKEN = re.compile(r'\s*(?:("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')'
+                    r'|(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)'
+                    r'|([A-Za-z_]\w*)|([{}\[\]:,]))')
+# inside double quotes, as in a POSIX shell, only \" and \\ are escapes
+_QUOTED_ESCAPE = re.compile(r'\\(["\\])')
+_NAMES = {'True': True, 'False': False, 'None': None}
+# dict keys parse_literal accepts: hashable literals
+_KEY_TYPES = (str, int, float, bool, type(None))
+
+
+def _string_literal(token):
+    """Returns the value of a quoted string token, escapes resolved as
+    Python does"""
+    if '\\' not in token:
+        return token[1:-1]
+    try:
+        # a single string literal: evaluates nothing
+        return ast.literal_eval(token)
+    except (SyntaxError, ValueError) as e:
+        raise ValueError("invalid string {}: {}".format(token, e))
+
+
+def parse_literal(text):
+    """Parses text as a Python literal without evaluating any code
+
+    Strings, ints, floats, True, False, None, lists and dicts are read in
+    one pass over the text, string escapes as in Python; anything else,
+    including a list or dict used as a dict key, raises ValueError.
+    """
+    tokens = []
+    pos, end = 0, len(text.rstrip())
+    while pos < end:
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError("unexpected {!r}".format(text[pos:pos + 10]))
+        tokens.append(match.groups())
+        pos = match.end()
+    tokens.append((None, None, None, ''))
+    value, pos = _parse_value(tokens, 0)
+    if pos != len(tokens) - 1:
+        raise ValueError("trailing text after the literal")
+    return value
+
+
+def _parse_value(tokens, pos):
+    """Reads the literal starting at tokens[pos], returns (value, next)"""
+    string, number, name, punct = tokens[pos]
+    if string is not None:
+        return _string_literal(string), pos + 1
+    if number is not None:
+        if number.lstrip('-').isdigit():
+            return int(number), pos + 1
+        return float(number), pos + 1
+    if name is not None:
+        if name not in _NAMES:
+            raise ValueError("names are not literals: {}".format(name))
+        return _NAMES[name], pos + 1
+    if punct == '[':
+        items, pos = _parse_items(tokens, pos + 1, ']', False)
+        return items, pos
+    if punct == '{':
+        items, pos = _parse_items(tokens, pos + 1, '}', True)
+        return dict(items), pos
+    raise ValueError("unexpected {!r}".format(punct or "end of text"))
+
+
+def _parse_items(tokens, pos, close, pairs):
+    """Reads comma separated values, or key: value pairs, up to close"""
+    items = []
+    while tokens[pos][3] != close:
+        item, pos = _parse_value(tokens, pos)
+        if pairs:
+            if tokens[pos][3] != ':':
+                raise ValueError("':' expected after a dict key")
+            if type(item) not in _KEY_TYPES:
+                raise ValueError("unhashable dict key {!r}".format(item))
+            value, pos = _parse_value(tokens, pos + 1)
+            item = (item, value)
+        items.append(item)
+        if tokens[pos][3] == ',':
+            pos += 1
+        elif tokens[pos][3] != close:
+            raise ValueError("',' or {!r} expected".format(close))
+    return items, pos + 1
+
+
+def parse_dot_call(line):
+    """Rewrites '<class>.<command>(<id>, <args>)' as the plain command line
+    '<command> <class> <id> <args>', or returns None for any other line"""
+    match = _DOT_CALL.match(line)
+    if match is None or match.group(2) not in HBNBCommand.dot_cmds:
+        return None
+    _cls, _cmd, pline = match.groups()
+    args = _DOT_ARGS.match(pline)
+    _id = args.group(1) if args.group(1) is not None else args.group(2)
+    _args = args.group(3) or ''
+    if not (_args.startswith('{') and _args.endswith('}')):
+        # positional args: "name", "value" -> "name" "value"
+        _args = _args.replace(',', '')
+    # a dict is passed on as text and parsed once, by do_update
+    return ' '.join([_cmd, _cls, _id, _args])
+
+
+def parse_params(text):
+    """Returns (key, value, quoted) per key=value word of text, read in one
+    pass; in quoted values \\" and \\\\ are resolved, as shlex.split() does.
+    Raises ValueError on an unbalanced quote."""
+    params = []
+    for match in _PARAM.finditer(text):
+        key, quoted, bare, other = match.groups()
+        if key and quoted is not None:
+            params.append((key, _QUOTED_ESCAPE.sub(r'\1', quoted), True))
+        elif key:
+            params.append((key, bare, False))
+        elif other is not None and other.count('"') % 2:
+            raise ValueError("No closing quotation")
+    return params
+
 
 class HBNBCommand(cmd.Cmd):
     """ Contains the functionality for the HBNB console"""
@@ -32,6 +167,11 @@ class HBNBCommand(cmd.Cmd):
         'max_guest': int, 'price_by_night': int,
         'latitude': float, 'longitude': float
     }
+    # where predicate operators of all and count, as query() lookups
+    lookups = {
+        '=': '', '!=': '__ne', '<': '__lt', '<=': '__lte',
+        '>': '__gt', '>=': '__gte'
+    }
 
     def preloop(self):
         """Prints if isatty is false"""
@@ -44,66 +184,91 @@ class HBNBCommand(cmd.Cmd):
         Usage: <class name>.<command>([<id> [<*args> or <**kwargs>]])
         (Brackets denote optional fields in usage example.)
         """
-        _cmd = _cls = _id = _args = ''  # initialize line elements
-
         # scan for general formating - i.e '.', '(', ')'
         if not ('.' in line and '(' in line and ')' in line):
             return line
-
-        try:  # parse line left to right
-            pline = line[:]  # parsed line
-
-            # isolate <class name>
-            _cls = pline[:pline.find('.')]
-
-            # isolate and validate <command>
-            _cmd = pline[pline.find('.') + 1:pline.find('(')]
-            if _cmd not in HBNBCommand.dot_cmds:
-                raise Exception
-
-            # if parantheses contain arguments, parse them
-            pline = pline[pline.find('(') + 1:pline.find(')')]
-            if pline:
-                # partition args: (<id>, [<delim>], [<*args>])
-                pline = pline.partition(', ')  # pline convert to tuple
-
-                # isolate _id, stripping quotes
-                _id = pline[0].replace('\"', '')
-                # possible bug here:
-                # empty quotes register as empty _id when replaced
-
-                # if arguments exist beyond _id
-                pline = pline[2].strip()  # pline is now str
-                if pline:
-                    # check for *args or **kwargs
-                    if pline[0] == '{' and pline[-1] == '}'\
-                            and type(eval(pline)) is dict:
-                        _args = pline
-                    else:
-                        _args = pline.replace(',', '')
-                        # _args = _args.replace('\"', '')
-            line = ' '.join([_cmd, _cls, _id, _args])
-
-        except Exception as mess:
-            pass
-        finally:
-            return line
+        return parse_dot_call(line) or line
 
     def postcmd(self, stop, line):
         """Prints if isatty is false"""
         try:
             if not sys.__stdin__.isatty():
                 # Check if we're in test mode (stdout is StringIO)
-                from io import StringIO
                 if not isinstance(sys.stdout, StringIO):
                     print('(hbnb) ', end='')
         except ValueError:
             # sys.__stdin__ is closed (happens during testing)
-            from io import StringIO
             if not isinstance(sys.stdout, StringIO):
                 print('(hbnb) ', end='')
         return stop
 
+    def run_batch(self, lines, out=None, flush_every=0, fail_fast=False):
+        """Runs each command of lines without prompts and returns an exit
+        status: 0 if every command succeeded, 1 otherwise.
+
+        One JSON object is written to out (default stdout) per command:
+        {"line": n, "command": ..., "ok": ..., "output": [...]} plus
+        "error" when the command printed a ** message ** or raised. Saves
+        are deferred and flushed once at the end, or every flush_every
+        commands; a failed flush is reported with the lines it covered.
+        Blank lines and lines starting with # are skipped; quit or EOF
+        ends the run, and so does the first failure with fail_fast.
+        """
+        out = out or sys.stdout
+        lines = iter(enumerate(lines, 1))
+        status = 0
+        number = None
+        done = False
+        while not done:
+            first = None
+            try:
+                with storage.batch():
+                    count = 0
+                    for number, line in lines:
+                        line = line.strip()
+                        if not line or line.startswith('#'):
+                            continue
+                        first = first or number
+                        record, done = self.__run_one(number, line)
+                        out.write(json.dumps(record) + '\n')
+                        if not record['ok']:
+                            status = 1
+                            done = done or fail_fast
+                        count += 1
+                        if done or count == flush_every:
+                            break
+                    else:
+                        done = True
+            except Exception as e:
+                out.write(json.dumps({
+                    'line': number, 'command': 'flush', 'ok': False,
+                    'output': [], 'lines': [first, number],
+                    'error': '{}: {}'.format(type(e).__name__, e)}) + '\n')
+                status = 1
+                done = done or fail_fast
+        return status
+
+    def __run_one(self, number, line):
+        """Runs one batch command, returns (record, whether it ended)"""
+        record = {'line': number, 'command': line, 'ok': True}
+        ended = False
+        output = StringIO()
+        try:
+            with redirect_stdout(output):
+                # no postcmd(): there is no prompt to print
+                ended = bool(cmd.Cmd.onecmd(self, self.precmd(line)))
+        except SystemExit:
+            ended = True
+        except Exception as e:
+            record['ok'] = False
+            record['error'] = '{}: {}'.format(type(e).__name__, e)
+        record['output'] = output.getvalue().splitlines()
+        for text in record['output']:
+            if record['ok'] and text.startswith('**'):
+                record['ok'] = False
+                record['error'] = text.strip('* ')
+        return record, ended
+
     def do_quit(self, command):
         """ Method to exit the HBNB console"""
         exit()
@@ -143,26 +308,20 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
             return
 
-        # First, identify which parameters are quoted
-        quoted_params = set()
-        # Find all parameter=value pairs where value is quoted
-        quoted_pattern = r'(\w+)="[^"]*"'
-        for match in re.finditer(quoted_pattern, args):
-            quoted_params.add(match.group(1))
-
-        try:
-            arg_list = shlex.split(args)
-        except ValueError as e:
-            print(f"** invalid input: {e} (check quotes) **")
-            return
-
+        arg_list = args.split(None, 1)
         if not arg_list:
             # Should not happen if args is not empty, but defensive
             print("** class name missing **")
             return
 
         class_name = arg_list[0]
-        params_list = arg_list[1:]
+        try:
+            # key=value words, read in one pass; other words are skipped
+            params_list = parse_params(arg_list[1] if len(arg_list) > 1
+                                       else '')
+        except ValueError as e:
+            print(f"** invalid input: {e} (check quotes) **")
+            return
 
         if class_name not in HBNBCommand.classes:
             print("** class doesn't exist **")
@@ -170,19 +329,14 @@ class HBNBCommand(cmd.Cmd):
 
         new_instance = HBNBCommand.classes[class_name]()
 
-        for param_pair_str in params_list:
-            if "=" not in param_pair_str:
-                # Skip malformed parameters silently
-                continue
-
-            key, value_str = param_pair_str.split("=", 1)
+        for key, value_str, quoted in params_list:
             parsed_value = None
             try:
                 # Check if this is a known typed parameter
                 if key in HBNBCommand.types:
                     param_type = HBNBCommand.types[key]
                     parsed_value = param_type(value_str)
-                elif key in quoted_params:
+                elif quoted:
                     # This parameter was originally quoted, treat as string
                     parsed_value = value_str.replace('_', ' ')
                 else:
@@ -255,6 +409,237 @@ class HBNBCommand(cmd.Cmd):
         print("Creates a class of any type")
         print("[Usage]: create <className>\n")
 
+    def do_load(self, args):
+        """ Creates many objects of a class from a file in one save.
+        Format: load <ClassName> <file>
+        A file ending in .csv is read as CSV with a header row, any other
+        file as JSON lines, one object per line. Records are checked
+        against the model's columns; invalid ones are reported by line
+        number and skipped.
+        """
+        arg_list = args.split()
+        if not arg_list:
+            print("** class name missing **")
+            return
+        if arg_list[0] not in HBNBCommand.classes:
+            print("** class doesn't exist **")
+            return
+        if len(arg_list) < 2:
+            print("** file name missing **")
+            return
+
+        cls = HBNBCommand.classes[arg_list[0]]
+        path = arg_list[1]
+        try:
+            f = open(path, newline='')
+        except OSError as e:
+            print(f"** can't read {path}: {e.strerror} **")
+            return
+        start = time.perf_counter()
+        with f:
+            objs = self.__load_objects(cls, f, path.endswith('.csv'))
+            try:
+                with storage.batch():
+                    count = storage.new_many(objs)
+            except Exception as e:
+                print(f"** an error occurred during load: {e} **")
+                return
+        elapsed = time.perf_counter() - start
+        print("{} {} loaded in {:.2f} s ({:.0f} rows/s)".format(
+            count, cls.__name__, elapsed, count / elapsed if elapsed else 0))
+
+    def __columns(self, cls):
+        """ Returns the attribute names records of cls may hold, in table
+        order, and the set of those a record must give in db mode """
+        columns = ['id', 'created_at', 'updated_at']
+        required = set()
+        table = getattr(cls, '__table__', None)
+        if table is not None:
+            columns += [name for name in table.columns.keys()
+                        if name not in columns]
+            if storage_type == 'db':
+                required = {c.name for c in table.columns
+                            if not (c.nullable or c.primary_key or
+                                    c.default is not None)}
+        columns += [name for name in cls._file_defaults
+                    if name not in columns]
+        return columns, required
+
+    def __typed(self, cls, attr, value):
+        """ Returns value as the type of the attr column of cls, parsing
+        strings; raises ValueError when it is not of that type """
+        table = getattr(cls, '__table__', None)
+        if table is not None:
+            column = table.columns.get(attr)
+        else:
+            column = getattr(BaseModel, attr, None)
+        if column is None:
+            # attributes without a column, such as amenity_ids: lists of
+            # ids, or values of the default's type
+            default = cls._file_defaults.get(attr)
+            if type(default) is list and not (
+                    type(value) is list and
+                    all(type(item) is str for item in value)):
+                raise ValueError(attr + " must be a list of ids")
+            return value
+        if value is None:
+            if not column.nullable:
+                raise ValueError(attr + " must not be null")
+            return value
+        kind = column.type.python_type
+        if type(value) is kind:
+            return value
+        if isinstance(value, str):
+            try:
+                if kind is datetime:
+                    return datetime.fromisoformat(value)
+                if kind in (int, float):
+                    return kind(value)
+            except ValueError:
+                pass
+        elif kind is float and type(value) is int:
+            return float(value)
+        raise ValueError("{} must be {}".format(attr, {
+            datetime: "an ISO 8601 time", int: "an integer",
+            float: "a number"}.get(kind, "a string")))
+
+    def __load_objects(self, cls, f, csv_file):
+        """ Yields a cls instance per valid record of f """
+        columns, required = self.__columns(cls)
+        columns = set(columns)
+        # the ORM must see each attribute set in db mode; file mode can
+        # take the bulk path reload() uses
+        build = cls.from_storage
+        if storage_type == 'db':
+            def build(record):
+                """Builds through __init__ so the session tracks values"""
+                return cls(**record)
+
+        # CSV cells hold list values, such as amenity_ids, as JSON
+        lists = {name for name, value in cls._file_defaults.items()
+                 if type(value) is list}
+        if csv_file:
+            reader = csv.DictReader(f)
+            records = ((reader.line_num, row) for row in reader)
+        else:
+            records = enumerate(f, 1)
+        for number, record in records:
+            try:
+                if csv_file:
+                    record = {key: json.loads(value) if key in lists
+                              else value for key, value in record.items()
+                              if value not in ('', None)}
+                elif not record.strip():
+                    continue
+                else:
+                    record = json.loads(record)
+                    if type(record) is not dict:
+                        raise ValueError("not a JSON object")
+                record.pop('__class__', None)
+                unknown = set(record) - columns
+                if unknown:
+                    raise ValueError("unknown attribute " +
+                                     ", ".join(sorted(map(str, unknown))))
+                missing = required - set(record)
+                if missing:
+                    raise ValueError("missing " + ", ".join(sorted(missing)))
+                for key, value in record.items():
+                    record[key] = self.__typed(cls, key, value)
+                yield build(record)
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"** line {number}: {e} **")
+
+    def help_load(self):
+        """ Help information for the load command """
+        print("Creates many objects of a class from a JSON lines or CSV file")
+        print("[Usage]: load <className> <file>\n")
+
+    def do_export(self, args):
+        """ Streams objects out as JSON lines or CSV, one at a time.
+        Format: export [<ClassName>] [--format jsonl|csv] [--since <ts>]
+                       [--output <file>]
+        --since keeps the objects updated after the ISO 8601 UTC time ts.
+        CSV needs a class name; its columns are the ones load accepts.
+        Output goes to stdout unless --output names a file.
+        """
+        try:
+            arg_list = shlex.split(args)
+        except ValueError as e:
+            print(f"** invalid input: {e} (check quotes) **")
+            return
+        cls = None
+        options = {'--format': 'jsonl', '--since': None, '--output': None}
+        while arg_list:
+            arg = arg_list.pop(0)
+            if arg in options:
+                if not arg_list:
+                    print(f"** value missing for {arg} **")
+                    return
+                options[arg] = arg_list.pop(0)
+            elif cls is None and arg in HBNBCommand.classes:
+                cls = HBNBCommand.classes[arg]
+            else:
+                print("** class doesn't exist **")
+                return
+
+        fmt = options['--format']
+        if fmt not in ('jsonl', 'csv'):
+            print("** format must be jsonl or csv **")
+            return
+        if fmt == 'csv' and cls is None:
+            print("** class name missing **")
+            return
+        since = options['--since']
+        if since is not None:
+            try:
+                since = datetime.fromisoformat(since)
+            except ValueError:
+                print("** invalid timestamp: {} **".format(since))
+                return
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+        out = sys.stdout
+        if options['--output'] is not None:
+            try:
+                out = open(options['--output'], 'w', newline='')
+            except OSError as e:
+                print(f"** can't write {options['--output']}: "
+                      f"{e.strerror} **")
+                return
+        try:
+            if fmt == 'csv':
+                writer = csv.DictWriter(out, self.__columns(cls)[0],
+                                        extrasaction='ignore')
+                writer.writeheader()
+
+                def write(record):
+                    """Writes record as one CSV row, lists as JSON"""
+                    writer.writerow({key: json.dumps(value)
+                                     if type(value) is list else value
+                                     for key, value in record.items()})
+            else:
+                def write(record):
+                    """Writes record as one JSON line"""
+                    out.write(json.dumps(record) + '\n')
+            count = 0
+            # exact class, like all
+            for obj in storage.iter_all(cls, since=since):
+                if cls is None or type(obj) is cls:
+                    write(obj.to_dict())
+                    count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if out is not sys.stdout:
+            print("{} objects exported".format(count))
+
+    def help_export(self):
+        """ Help information for the export command """
+        print("Streams objects as JSON lines or CSV to stdout or a file")
+        print("[Usage]: export [<className>] [--format jsonl|csv] "
+              "[--since <ts>] [--output <file>]\n")
+
     def do_show(self, args):
         """ Method to show an individual object """
         new = args.partition(" ")
@@ -277,11 +662,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage.all()[key])
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+        print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -308,53 +693,135 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            del (storage.all()[key])
-            storage.save()
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+        with storage.batch():
+            storage.delete(obj)
+            storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
         print("Destroys an individual instance of a class")
         print("[Usage]: destroy <className> <objectId>\n")
 
-    def do_all(self, args):
-        """ Shows all objects, or all objects of a class"""
-        print_list = []
+    def __where(self, cls, predicates):
+        """ Turns <attr><op><value> predicates into query() lookups, or
+        returns None after printing what is wrong with one """
+        lookups = {}
+        columns = self.__columns(cls)[0]
+        for predicate in predicates:
+            match = re.fullmatch(r'(\w+)(!=|<=|>=|=|<|>)(.*)', predicate)
+            if not match:
+                print("** invalid predicate: {} **".format(predicate))
+                return None
+            attr, op, value = match.groups()
+            if attr not in columns:
+                print("** attribute doesn't exist: {} **".format(attr))
+                return None
+            if type(cls._file_defaults.get(attr)) is not list:
+                # amenity_ids=<id> matches the lists holding that id
+                try:
+                    value = self.__typed(cls, attr, value)
+                except ValueError:
+                    print("** invalid value: {} **".format(predicate))
+                    return None
+                if isinstance(value, str):
+                    # spelled like create: underscores stand for spaces
+                    value = value.replace('_', ' ')
+            lookups[attr + HBNBCommand.lookups[op]] = value
+        return lookups
+
+    def __matching(self, args):
+        """ Parses "<class> [<predicate> ...]" into (cls, lookups); cls or
+        lookups is None after an error was printed """
+        try:
+            arg_list = shlex.split(args)
+        except ValueError as e:
+            print(f"** invalid input: {e} (check quotes) **")
+            return None, None
+        if not arg_list or arg_list[0] not in HBNBCommand.classes:
+            print("** class doesn't exist **")
+            return None, None
+        cls = HBNBCommand.classes[arg_list[0]]
+        return cls, self.__where(cls, arg_list[1:])
 
+    def do_all(self, args):
+        """ Shows all objects, or the objects of a class matching every
+        where predicate, e.g. all Place price_by_night>100 """
+        cls = None
         if args:
-            args = args.split(' ')[0]  # remove possible trailing args
-            if args not in HBNBCommand.classes:
-                print("** class doesn't exist **")
+            cls, lookups = self.__matching(args)
+            if cls is None or lookups is None:
                 return
-            for k, v in storage.all().items():
-                if k.split('.')[0] == args:
-                    print_list.append(str(v))
         else:
-            for k, v in storage.all().items():
-                print_list.append(str(v))
-
-        print(print_list)
+            lookups = {}
+
+        if lookups and storage_type == 'db' and cls is BaseModel:
+            # no table: every row belongs to a subclass
+            objs = ()
+        elif lookups:
+            # filtered by the storage engine, in SQL in db mode; run
+            # before printing anything
+            try:
+                objs = storage.query(cls).filter(**lookups).all()
+            except TypeError:
+                # stored values of another type than the column's
+                print("** invalid value **")
+                return
+        else:
+            objs = storage.iter_all(cls)
+        # print the list repr one object at a time instead of building it
+        print('[', end='')
+        sep = ''
+        for obj in objs:
+            if cls is None or type(obj) is cls:
+                print(sep + repr(str(obj)), end='')
+                sep = ', '
+        print(']')
 
     def help_all(self):
         """ Help information for the all command """
-        print("Shows all objects, or all of a class")
-        print("[Usage]: all <className>\n")
+        print("Shows all objects, or all of a class matching predicates")
+        print("[Usage]: all <className> [<attr><op><value> ...]")
+        print("    op is one of = != < <= > >=\n")
 
     def do_count(self, args):
-        """Count current number of class instances"""
-        count = 0
-        for k, v in storage.all().items():
-            if args == k.split('.')[0]:
-                count += 1
-        print(count)
+        """Count current number of class instances, optionally only those
+        matching every where predicate, e.g. count Place max_guest>=4"""
+        name = args.split(' ')[0]
+        if name not in HBNBCommand.classes:
+            print(0)
+            return
+        cls, lookups = self.__matching(args)
+        if lookups is None:
+            return
+
+        def count(cls):
+            """Counts cls objects in the storage engine"""
+            if lookups:
+                return storage.query(cls).filter(**lookups).count()
+            return storage.count(cls)
+        if lookups and storage_type == 'db' and cls is BaseModel:
+            # no table: every row belongs to a subclass
+            print(0)
+            return
+        # counts include subclasses, the console counts exact classes
+        try:
+            total = count(cls)
+            for other in HBNBCommand.classes.values():
+                if other is not cls and issubclass(other, cls):
+                    total -= count(other)
+        except TypeError:
+            # stored values of another type than the column's
+            print("** invalid value **")
+            return
+        print(total)
 
     def help_count(self):
         """ """
-        print("Usage: count <class_name>")
+        print("Usage: count <class_name> [<attr><op><value> ...]")
 
     def do_update(self, args):
         """ Updates a certain object with new info """
@@ -379,17 +846,23 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
-
-        # determine if key is present
-        if key not in storage.all():
+        # determine if the instance is present
+        new_dict = storage.get(HBNBCommand.classes[c_name], c_id)
+        if new_dict is None:
             print("** no instance found **")
             return
 
         # first determine if kwargs or args
-        if '{' in args[2] and '}' in args[2] and type(eval(args[2])) is dict:
-            kwargs = eval(args[2])
+        kwargs = args[2].strip()
+        if kwargs.startswith('{') and kwargs.endswith('}'):
+            try:
+                kwargs = parse_literal(kwargs)
+            except ValueError as e:
+                print(f"** invalid dictionary: {e} **")
+                return
+            if type(kwargs) is not dict:
+                print("** invalid dictionary: not a dict **")
+                return
             args = []  # reformat kwargs into list, ex: [<n>, <value>, ...]
             for k, v in kwargs.items():
                 args.append(k)
@@ -416,9 +889,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, att_name in enumerate(args):
             # block only runs on even iterations
@@ -437,6 +907,8 @@ class HBNBCommand(cmd.Cmd):
                 # update dictionary with name, value pair
                 new_dict.__dict__.update({att_name: att_val})
 
+        # save() also marks the object changed for file storage, which
+        # does not see the __dict__ update above
         new_dict.save()  # save updates to file
 
     def help_update(self):
@@ -446,4 +918,26 @@ class HBNBCommand(cmd.Cmd):
 
 
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    parser = argparse.ArgumentParser(description="HBNB console")
+    parser.add_argument('--batch', metavar='FILE', nargs='?', const='-',
+                        help="run the commands of FILE (default stdin) "
+                             "and print one JSON result per line")
+    parser.add_argument('--flush-every', metavar='N', type=int, default=0,
+                        help="with --batch, save every N commands instead "
+                             "of once at the end")
+    parser.add_argument('--fail-fast', action='store_true',
+                        help="with --batch, stop at the first failure")
+    options = parser.parse_args()
+    if options.batch is None:
+        HBNBCommand().cmdloop()
+    else:
+        try:
+            script = sys.stdin if options.batch == '-' \
+                else open(options.batch)
+        except OSError as e:
+            parser.exit(2, "** can't read {}: {} **\n".format(
+                options.batch, e.strerror))
+        with script:
+            sys.exit(HBNBCommand().run_batch(
+                script, flush_every=options.flush_every,
+                fail_fast=options.fail_fast))
@@ -3,19 +3,25 @@
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
+import models
 import os
 
 
 class Amenity(BaseModel, Base):
     """Amenity class that inherits from BaseModel and Base"""
     __tablename__ = 'amenities'
-    name = Column(String(128), nullable=False)
+    name = Column(String(128), nullable=False, index=True)
     # The place_amenities relationship will be created by the backref
     # from Place.amenities
 
-    def __init__(self, *args, **kwargs):
-        """Initializes Amenity instance"""
-        super().__init__(*args, **kwargs)
-        if os.getenv('HBNB_TYPE_STORAGE') != 'db':
-            if 'name' not in kwargs:
-                self.name = ""
+    _file_defaults = {'name': ""}
+
+    if os.getenv('HBNB_TYPE_STORAGE') != 'db':
+        @property
+        def place_amenities(self):
+            """Returns the list of Place instances offering this Amenity"""
+            from models.place import Place
+            key = (self.storage_key, 'place_amenities')
+            places = models.storage.view(key, lambda: list(
+                models.storage.lookup(Place, 'amenity_ids', self.id).values()))
+            return list(places)
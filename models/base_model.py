@@ -1,91 +1,165 @@
 #!/usr/bin/python3
 """This module defines a base class for all models in our hbnb clone"""
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import models
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import BigInteger, Column, String, DateTime
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import configure_mappers
 import os
 
 Base = declarative_base()
 
+# read once: models pick their file or db behaviour at import time anyway
+storage_type = os.getenv('HBNB_TYPE_STORAGE')
+
+# class -> names accepted as kwargs, filled on first use
+_allowed_keys = {}
+
+# MySQL's DATETIME drops microseconds unless asked for them
+Timestamp = DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
+def utcnow():
+    """Returns the current UTC time as the naive datetime models store"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _allowed(cls):
+    """Returns the attribute names that may be set on cls from a dict"""
+    try:
+        return _allowed_keys[cls]
+    except KeyError:
+        # from_storage() skips __init__, which would otherwise set up the
+        # mapped attributes on first use
+        configure_mappers()
+        keys = frozenset(dir(cls)) | {'id', 'created_at', 'updated_at'}
+        _allowed_keys[cls] = keys
+        return keys
+
 
 class BaseModel(Base):
     __abstract__ = True
     """A base class for all hbnb models"""
     id = Column(String(60), primary_key=True, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow())
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow())
+    created_at = Column(Timestamp, nullable=False, default=utcnow)
+    updated_at = Column(Timestamp, nullable=False, default=utcnow,
+                        onupdate=utcnow, index=True)
+    # storage-wide counter, set by storage each time the object is saved
+    change_seq = Column(BigInteger, nullable=True, index=True)
+
+    # In file storage, the attributes each subclass sets on instances
+    # created without them, by __init__ and from_storage(). Columns only
+    # give defaults in db mode. A list value is copied per instance, so
+    # e.g. every Place has its own amenity_ids.
+    _file_defaults = {}
 
     def __init__(self, *args, **kwargs):
         """Instatntiates a new model"""
         if not kwargs:
             self.id = str(uuid.uuid4())
-            self.created_at = datetime.now()
-            self.updated_at = datetime.now()
+            self.created_at = self.updated_at = utcnow()
         else:
-            # Attributes that can be set via kwargs for any BaseModel
-            # derivative. This includes Columns defined in subclasses.
-            # Get class-level attributes  #  Ensure two spaces before comment
-            allowed_keys = set(self.__class__.__dict__.keys())
-            # Add instance-level attributes that might be set before this
-            # loop by a superclass or similar.
-            # For BaseModel itself, primary ones are id, created_at,
-            # updated_at. This check needs to be robust for inheritance.
+            # Legit keys: id, created_at, updated_at, or any attribute of
+            # the class such as a Column defined in a subclass.
+            allowed = _allowed(self.__class__)
 
             for key, value in kwargs.items():
                 if key == "__class__":
                     continue
 
-                # Check if the key is a legitimate attribute to set.
-                # Legit: id, created_at, updated_at, or any Column name
-                # in class.
-                if key not in ['id', 'created_at', 'updated_at'] and \
-                   not hasattr(self.__class__, key):
-                    # If it's not a base known key and not a class
-                    # attribute (like a Column).
-                    # Then it's an unexpected kwarg for this model type.
+                if key not in allowed:
+                    # unexpected kwarg for this model type
                     raise KeyError(
                         f"Invalid attribute '{key}' for "
                         f"class {self.__class__.__name__}"
                     )
 
-                if key == "created_at" or key == "updated_at":
-                    value = datetime.strptime(
-                        value,
-                        '%Y-%m-%dT%H:%M:%S.%f'
-                    )
+                if (key == "created_at" or key == "updated_at") and \
+                        isinstance(value, str):
+                    value = datetime.fromisoformat(value)
                 setattr(self, key, value)
 
             # Set default values if not provided in kwargs
             if "id" not in kwargs:
                 self.id = str(uuid.uuid4())
             if "created_at" not in kwargs:
-                self.created_at = datetime.now()
+                self.created_at = utcnow()
             if "updated_at" not in kwargs:
-                self.updated_at = datetime.now()
+                self.updated_at = utcnow()
+
+        if storage_type != 'db':
+            for key, value in self._file_defaults.items():
+                if key not in kwargs:
+                    # list defaults are copied so instances never share one
+                    if type(value) is list:
+                        value = list(value)
+                    setattr(self, key, value)
+
+    @classmethod
+    def from_storage(cls, record):
+        """Builds an instance from a dict read back from file storage
+
+        This is the bulk path used by FileStorage.reload(): it validates
+        keys against a per-class set and fills __dict__ directly instead
+        of going through __init__ and setattr. record is consumed.
+        """
+        allowed = _allowed(cls)
+        record.pop('__class__', None)
+        for key in record:
+            if key not in allowed:
+                raise KeyError(f"Invalid attribute '{key}' for "
+                               f"class {cls.__name__}")
+        for key in ('created_at', 'updated_at'):
+            value = record.get(key)
+            if value is None:
+                record[key] = utcnow()
+            elif isinstance(value, str):
+                record[key] = datetime.fromisoformat(value)
+        if 'id' not in record:
+            record['id'] = str(uuid.uuid4())
+
+        manager = cls.__dict__.get('_sa_class_manager')
+        obj = manager.new_instance() if manager else cls.__new__(cls)
+        obj.__dict__.update(record)
+        if storage_type != 'db':
+            for key, value in cls._file_defaults.items():
+                if key not in record:
+                    if type(value) is list:
+                        value = list(value)
+                    obj.__dict__[key] = value
+        return obj
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and lets file storage drop its cached copy"""
+        super().__setattr__(name, value)
+        if storage_type != 'db':
+            models.storage.touch(self)
+
+    @property
+    def storage_key(self):
+        """The <class name>.<id> key the instance is stored under"""
+        return type(self).__name__ + '.' + self.id
 
     def __str__(self):
         """Returns a string representation of the instance"""
-        cls = (str(type(self)).split('.')[-1]).split('\'')[0]
-        return '[{}] ({}) {}'.format(cls, self.id, self.__dict__)
+        return '[{}] ({}) {}'.format(type(self).__name__, self.id,
+                                     self.__dict__)
 
     def save(self):
         """Updates updated_at with current time when instance is changed"""
-        self.updated_at = datetime.now()
+        self.updated_at = utcnow()
         models.storage.new(self)
         models.storage.save()
 
     def to_dict(self):
         """Convert instance into dict format"""
-        dictionary = {}
-        dictionary.update(self.__dict__)
-        dictionary.update({'__class__':
-                          (str(type(self)).split('.')[-1]).split('\'')[0]})
+        dictionary = self.__dict__.copy()
+        dictionary.pop('_sa_instance_state', None)
+        dictionary['__class__'] = type(self).__name__
         dictionary['created_at'] = self.created_at.isoformat()
         dictionary['updated_at'] = self.updated_at.isoformat()
-        if '_sa_instance_state' in dictionary:
-            del dictionary['_sa_instance_state']
         return dictionary
 
     def delete(self):
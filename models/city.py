@@ -1,24 +1,18 @@
 #!/usr/bin/python3
 """ City Module for HBNB project """
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
-import os
 
 
 class City(BaseModel, Base):
     """ The city class, contains state ID and name """
     __tablename__ = 'cities'
+    # cities of a state, already in name order
+    __table_args__ = (Index('ix_cities_state_id_name', 'state_id', 'name'),)
     name = Column(String(128), nullable=False)
     state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
     places = relationship("Place", backref="cities",
                           cascade="all, delete-orphan")
 
-    def __init__(self, *args, **kwargs):
-        """Initializes City instance"""
-        super().__init__(*args, **kwargs)
-        if os.getenv('HBNB_TYPE_STORAGE') != 'db':
-            if 'name' not in kwargs:
-                self.name = ""
-            if 'state_id' not in kwargs:
-                self.state_id = ""
+    _file_defaults = {'name': "", 'state_id': ""}
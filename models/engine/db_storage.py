@@ -1,9 +1,15 @@
 #!/usr/bin/python3
 """This module defines a class to manage database storage for hbnb clone"""
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from contextlib import contextmanager
+from sqlalchemy import (BigInteger, Column, Integer, String, Table, and_,
+                        create_engine, event, func, inspect, or_, select,
+                        text)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import (joinedload, scoped_session, selectinload,
+                            sessionmaker)
 from models.base_model import Base
+from models.engine.query import OPERATORS, Query
 from models.user import User
 from models.place import Place
 from models.state import State
@@ -11,11 +17,35 @@ from models.city import City
 from models.amenity import Amenity
 from models.review import Review
 
+# one row per saved change when HBNB_CHANGE_LOG=1, read by changes_since()
+change_log = Table('change_log', Base.metadata,
+                   Column('seq', BigInteger, primary_key=True,
+                          autoincrement=False),
+                   Column('op', String(7), nullable=False),
+                   Column('key', String(128), nullable=False))
+
+# a single row holding the last change_seq handed out; each flush moves it
+# forward in its own transaction, so concurrent writers never share a value
+change_counter = Table('change_counter', Base.metadata,
+                       Column('id', Integer, primary_key=True,
+                              autoincrement=False),
+                       Column('seq', BigInteger, nullable=False))
+
 
 class DBStorage:
-    """This class manages storage of hbnb models in a SQL database"""
+    """This class manages storage of hbnb models in a SQL database
+
+    Every flush stamps new and changed rows with the next values of a
+    change_seq counter shared by all tables. The counter is a row of the
+    change_counter table, advanced inside the flush's transaction: the
+    row lock makes concurrent writers, even in other processes, take
+    turns, so values are unique and follow commit order. With
+    HBNB_CHANGE_LOG=1 the same flush also writes one change_log row per
+    created, updated or deleted object, committed with it.
+    """
     __engine = None
     __session = None
+    __classes = [User, State, City, Amenity, Place, Review]
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -24,6 +54,8 @@ class DBStorage:
         host = os.getenv('HBNB_MYSQL_HOST')
         db = os.getenv('HBNB_MYSQL_DB')
         env = os.getenv('HBNB_ENV')
+        self.__batch_depth = 0
+        self.__log = os.getenv('HBNB_CHANGE_LOG') == '1'
 
         self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
                                       format(user, pwd, host, db),
@@ -33,41 +65,213 @@ class DBStorage:
             Base.metadata.drop_all(self.__engine)
 
         # Initialize session and ensure tables exist (idempotent)
-        Base.metadata.create_all(self.__engine)
-        session_factory = sessionmaker(bind=self.__engine,
-                                       expire_on_commit=False)
-        self.__session = scoped_session(session_factory)
-
-    def all(self, cls=None):
-        """Query on the current database session"""
-        classes = [User, State, City, Amenity, Place, Review]
-        new_dict = {}
+        self.reload()
 
+    def all(self, cls=None, eager=()):
+        """Query on the current database session
+        Args:
+            cls (class, optional): Class to filter objects by
+            eager (iterable, optional): Relationships of cls to load up
+                front, e.g. ('cities',). Each is loaded with one extra
+                SELECT ... IN query, or joined into the main query when
+                written 'cities:joined'; dotted names such as
+                'cities.places' follow nested relationships.
+        """
         if cls is not None:
-            objs = self.__session.query(cls).all()
-            for obj in objs:
-                key = obj.__class__.__name__ + '.' + obj.id
-                new_dict[key] = obj
-        else:
-            for cls in classes:
-                objs = self.__session.query(cls).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
-        return new_dict
+            objs = self.__session.query(cls).options(
+                *self.__eager_options(cls, eager))
+            return {cls.__name__ + '.' + obj.id: obj for obj in objs}
+        return {type(obj).__name__ + '.' + obj.id: obj
+                for obj in self.iter_all()}
+
+    def get(self, cls, id):
+        """Returns the cls object with this primary key, or None"""
+        if cls not in DBStorage.__classes:
+            return None
+        return self.__session.get(cls, id)
+
+    def count(self, cls=None):
+        """Returns the number of rows of cls (default every class)"""
+        total = 0
+        for table_cls in DBStorage.__classes:
+            if cls is None or issubclass(table_cls, cls):
+                total += self.__session.query(
+                    func.count(table_cls.id)).scalar()
+        return total
+
+    def iter_all(self, cls=None, since=None):
+        """Yields the objects of cls (default every class) one at a time
+
+        Each table is read through a server-side cursor in batches of
+        1000 rows, so memory stays flat however many rows there are.
+        With since (a datetime), only rows updated after it are read,
+        through the updated_at index.
+        """
+        for table_cls in DBStorage.__classes:
+            if cls is None or issubclass(table_cls, cls):
+                rows = self.__session.query(table_cls)
+                if since is not None:
+                    rows = rows.filter(table_cls.updated_at > since)
+                yield from rows.yield_per(1000)
+
+    def __eager_options(self, cls, eager):
+        """Builds loader options for the relationship names in eager"""
+        loaders = {'selectin': selectinload, 'joined': joinedload}
+        options = []
+        for spec in eager:
+            path, _, strategy = spec.partition(':')
+            loader = loaders[strategy or 'selectin']
+            option = None
+            for name in path.split('.'):
+                attr = getattr(cls, name)
+                if option is None:
+                    option = loader(attr)
+                else:
+                    option = getattr(option, loader.__name__)(attr)
+                cls = attr.property.mapper.class_
+            options.append(option)
+        return options
+
+    def lookup(self, cls, attr, value):
+        """Query cls objects whose attr equals value"""
+        objs = self.__session.query(cls).filter(getattr(cls, attr) == value)
+        return {obj.__class__.__name__ + '.' + obj.id: obj for obj in objs}
+
+    def query(self, cls):
+        """Returns a Query over cls rows, see models.engine.query"""
+        return Query(cls, self.__run_query, self.__count_query)
+
+    def __run_query(self, query):
+        """Compiles query into a single SELECT and runs it"""
+        return self.__select(query).options(
+            *self.__eager_options(query.cls, query.eager_names)).all()
+
+    def __count_query(self, query):
+        """Counts the rows of query with one SELECT COUNT, loading none"""
+        sql = self.__select(query)
+        if query.limit_count is None and not query.offset_count:
+            return sql.order_by(None).with_entities(
+                func.count(query.cls.id)).scalar()
+        # a page: count the rows of the limited SELECT
+        return sql.count()
+
+    def __select(self, query):
+        """Compiles query, without its loader hints, into an ORM query"""
+        cls = query.cls
+        sql = self.__session.query(cls)
+        for attr, op, value in query.filters:
+            if attr == 'amenity_ids' and op == 'eq':
+                sql = sql.filter(cls.amenities.any(id=value))
+            elif op == 'in':
+                sql = sql.filter(getattr(cls, attr).in_(value))
+            else:
+                sql = sql.filter(OPERATORS[op](getattr(cls, attr), value))
+        keys = query.keys()
+        if query.bound is not None:
+            # (a, b) after (x, y): a > x OR (a = x AND b > y), per direction;
+            # NULLs sort first ascending and last descending, as in MySQL
+            after, equal = [], []
+            for (attr, descending), value in zip(keys, query.bound):
+                column = getattr(cls, attr)
+                if value is None:
+                    # only values follow NULL ascending, nothing descending
+                    step = None if descending else column.is_not(None)
+                    same = column.is_(None)
+                elif descending:
+                    step = or_(column < value, column.is_(None))
+                    same = column == value
+                else:
+                    step = column > value
+                    same = column == value
+                if step is not None:
+                    after.append(and_(*equal, step))
+                equal.append(same)
+            sql = sql.filter(or_(*after))
+        sql = sql.order_by(*(getattr(cls, attr).desc() if descending
+                             else getattr(cls, attr).asc()
+                             for attr, descending in keys))
+        if query.offset_count:
+            sql = sql.offset(query.offset_count)
+        if query.limit_count is not None:
+            sql = sql.limit(query.limit_count)
+        return sql
+
+    def changes_since(self, cursor=0):
+        """Yields (seq, op, key, obj) for each change committed after cursor
+
+        op is 'created', 'updated' or 'deleted'; obj is the object as it
+        is now, or None once it is gone. Pass the last seq seen as the
+        next cursor. Needs HBNB_CHANGE_LOG=1 when the changes were made.
+        """
+        classes = {cls.__name__: cls for cls in DBStorage.__classes}
+        rows = self.__session.execute(
+            change_log.select().where(change_log.c.seq > cursor)
+            .order_by(change_log.c.seq)).all()
+        for seq, op, key in rows:
+            obj = None
+            if op != 'deleted':
+                name, _, obj_id = key.partition('.')
+                obj = self.get(classes[name], obj_id)
+            yield seq, op, key, obj
 
     def new(self, obj):
         """Add the object to the current database session"""
         self.__session.add(obj)
 
+    def new_many(self, objs, chunk_size=1000):
+        """Adds every object of the iterable objs, returns how many
+
+        Objects are flushed chunk_size at a time, which the ORM sends as
+        batched INSERTs, and then dropped from the session so memory
+        stays flat. Nothing is committed; wrap the call in batch() or
+        call save().
+        """
+        count = 0
+        chunk = []
+        for obj in objs:
+            chunk.append(obj)
+            if len(chunk) == chunk_size:
+                count += self.__flush_out(chunk)
+                chunk = []
+        return count + self.__flush_out(chunk)
+
+    def __flush_out(self, objs):
+        """Inserts objs now and forgets them, returns how many"""
+        self.__session.add_all(objs)
+        self.__session.flush()
+        for obj in objs:
+            self.__session.expunge(obj)
+        return len(objs)
+
     def save(self):
         """Commit all changes of the current database session"""
+        if self.__batch_depth:
+            return
         try:
             self.__session.commit()
         except Exception:
             self.__session.rollback()
             raise
 
+    @contextmanager
+    def batch(self):
+        """Commits every save() made inside the block in one transaction
+
+        If the block raises, the session is rolled back and the exception
+        propagates.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__batch_depth -= 1
+            if not self.__batch_depth:
+                self.__session.rollback()
+            raise
+        self.__batch_depth -= 1
+        if not self.__batch_depth:
+            self.save()
+
     def delete(self, obj=None):
         """Delete from the current database session obj if not None"""
         if obj is not None:
@@ -76,10 +280,86 @@ class DBStorage:
     def reload(self):
         """Create all tables in the database and re-initialize session"""
         Base.metadata.create_all(self.__engine)
+        self.__migrate()
+        self.__seed_counter()
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
+        event.listen(session_factory, 'before_flush', self.__stamp)
         self.__session = scoped_session(session_factory)
 
+    def __seed_counter(self):
+        """Creates the change_counter row, resumed from the highest stored
+        change_seq or change_log seq, unless it already exists"""
+        with self.__engine.begin() as conn:
+            if conn.execute(select(change_counter.c.seq)).first():
+                return
+            seed = max([conn.execute(select(func.max(table_cls.change_seq)))
+                        .scalar() or 0 for table_cls in DBStorage.__classes] +
+                       [conn.execute(select(func.max(change_log.c.seq)))
+                        .scalar() or 0])
+        try:
+            with self.__engine.begin() as conn:
+                conn.execute(change_counter.insert().values(id=1, seq=seed))
+        except IntegrityError:
+            pass  # another process seeded it first
+
+    def __migrate(self):
+        """Adds the columns and indexes missing from existing tables
+
+        create_all() only creates whole tables, so databases made by an
+        older version get new columns and indexes here. New columns must
+        be nullable or have a server default to be added to filled tables.
+        An index is skipped when one on the same columns already exists,
+        such as the one MySQL makes for a foreign key.
+        """
+        inspector = inspect(self.__engine)
+        with self.__engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                columns = {c['name'] for c in inspector.get_columns(
+                    table.name)}
+                for column in table.columns:
+                    if column.name not in columns:
+                        ddl = 'ALTER TABLE {} ADD COLUMN {} {}'.format(
+                            table.name, column.name,
+                            column.type.compile(conn.dialect))
+                        conn.execute(text(ddl))
+                existing = inspector.get_indexes(table.name)
+                names = {i['name'] for i in existing}
+                covered = {tuple(i['column_names']) for i in existing}
+                for index in table.indexes:
+                    columns = tuple(c.name for c in index.columns)
+                    if index.name not in names and columns not in covered:
+                        index.create(conn)
+
+    def __stamp(self, session, flush_context, instances):
+        """Stamps the rows changed in this flush with the next change_seq
+
+        With HBNB_CHANGE_LOG=1 each change is also written to change_log.
+        """
+        changes = [(obj, 'created') for obj in session.new]
+        changes += [(obj, 'updated') for obj in session.dirty
+                    if session.is_modified(obj)]
+        changes += [(obj, 'deleted') for obj in session.deleted]
+        if not changes:
+            return
+        # reserve len(changes) values; the row stays locked until commit
+        with session.no_autoflush:
+            session.execute(change_counter.update()
+                            .where(change_counter.c.id == 1)
+                            .values(seq=change_counter.c.seq + len(changes)))
+            seq = session.execute(select(change_counter.c.seq)
+                                  .where(change_counter.c.id == 1)).scalar()
+        seq -= len(changes)
+        rows = []
+        for obj, op in changes:
+            seq += 1
+            if op != 'deleted':
+                obj.change_seq = seq
+            rows.append({'seq': seq, 'op': op,
+                         'key': type(obj).__name__ + '.' + obj.id})
+        if self.__log:
+            session.execute(change_log.insert(), rows)
+
     def close(self):
         """Call remove() method on the private session attribute"""
         self.__session.remove()
@@ -1,38 +1,257 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
+import hashlib
 import json
+import operator
+import os
+import shutil
+import sys
+from datetime import datetime
+from contextlib import contextmanager
+from models.engine.query import OPERATORS, Query
+from models.engine.serializers import get_serializer, serializer_for
+
+
+def _replace_text(path, text):
+    """Atomically replaces the file at path with text"""
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fsync_dir(path):
+    """Flushes the directory entry of path, where the OS supports it"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _sort_key(value):
+    """Orders None before any other value"""
+    return (value is not None, value)
+
+
+def _not_null(test):
+    """Wraps test so that None never matches, like NULL in SQL"""
+    return lambda value, bound: value is not None and test(value, bound)
+
+
+def _sorts_after(obj, bound, keys):
+    """Tells if obj comes after the bound values in the keys order"""
+    for (attr, descending), limit in zip(keys, bound):
+        value, limit = _sort_key(getattr(obj, attr, None)), _sort_key(limit)
+        if value != limit:
+            return (value < limit) if descending else (value > limit)
+    return False
 
 
 class FileStorage:
-    """This class manages storage of hbnb models in JSON format"""
+    """This class manages storage of hbnb models in a file
+
+    The file is JSON unless HBNB_FILE_FORMAT selects another serializer
+    (see models.engine.serializers).
+
+    By default every save() rewrites the whole file. When the environment
+    variable HBNB_FILE_JOURNAL is set to 1, save() and delete() instead
+    append one record per changed object to a write-ahead log next to the
+    snapshot, and the snapshot is only rewritten once the log grows past
+    HBNB_FILE_JOURNAL_MAX bytes (and past the size of the snapshot itself).
+
+    Each object's encoded member is kept between snapshots, so a save only
+    re-encodes the objects that changed since the last one and splices the
+    rest in as bytes. Models report changes through touch() on attribute
+    assignment and save(); changes made in place, e.g. to a list value or
+    through __dict__, need an explicit touch() or save() to be picked up.
+    HBNB_FILE_CACHE=0 turns this off and re-encodes everything every time.
+
+    HBNB_FILE_LAZY=1 keeps reloaded records as plain dicts until their
+    class is first read. HBNB_FILE_COMPACT=1 does the same with compact
+    records instead: a tuple of values ending with a key tuple shared by
+    every record of that shape, with interned ids, foreign keys and class
+    names and parsed timestamps. Models are built from them on demand.
+
+    Every new() stamps the object with the next value of a store-wide
+    change_seq counter, which reload() resumes from the highest value on
+    disk, so change_seq orders changes even when timestamps tie.
+
+    With HBNB_CHANGE_LOG=1, every new() and delete() is also recorded as
+    a [change_seq, op, key] line appended to file.json.changes on save(),
+    which changes_since() reads back.
+    """
     __file_path = 'file.json'
     __objects = {}
+    __raw = {}
+    __shapes = {}
+    __pending = set()
+    __members = {}
+    __members_format = None
+    __by_class = {}
+    __by_fk = {}
+    __fk_of = {}
+    __indexed = None
+    __generation = 0
+    __seq = 0
+    __changes = []
+    __views = {}
+    __views_at = 0
+    __foreign_keys = ('state_id', 'city_id', 'place_id', 'user_id')
+    __member_keys = ('amenity_ids',)
+
+    def __init__(self):
+        """Instantiate a FileStorage object"""
+        self.__journal = os.getenv('HBNB_FILE_JOURNAL') == '1'
+        self.__journal_max = int(os.getenv('HBNB_FILE_JOURNAL_MAX',
+                                           4 * 1024 * 1024))
+        self.__compact = os.getenv('HBNB_FILE_COMPACT') == '1'
+        self.__lazy = self.__compact or os.getenv('HBNB_FILE_LAZY') == '1'
+        self.__checksum = os.getenv('HBNB_FILE_CHECKSUM') == '1'
+        self.__serializer = get_serializer(os.getenv('HBNB_FILE_FORMAT'))
+        self.__cache = os.getenv('HBNB_FILE_CACHE') != '0'
+        self.__log = os.getenv('HBNB_CHANGE_LOG') == '1'
+        self.__batch_depth = 0
 
-    def all(self, cls=None):
+    def all(self, cls=None, eager=()):
         """Returns a dictionary of models currently in storage
         Args:
             cls (class, optional): Class to filter objects by
+            eager (iterable, optional): Accepted for DBStorage parity;
+                file-mode relationships are index lookups already
         """
+        self.__materialize(cls)
         if cls is not None:
             filtered_dict = {}
-            for key, value in FileStorage.__objects.items():
-                if isinstance(value, cls):
-                    filtered_dict[key] = value
+            for obj_cls, objs in FileStorage.__by_class.items():
+                if issubclass(obj_cls, cls):
+                    filtered_dict.update(objs)
             return filtered_dict
         return FileStorage.__objects
 
+    def get(self, cls, id):
+        """Returns the cls object with this id, or None"""
+        key = cls.__name__ + '.' + id
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            val_dict = FileStorage.__raw.get(cls, {}).pop(key, None)
+            if val_dict is not None:
+                self.__sync_indexes()
+                obj = cls.from_storage(self.__unpack(val_dict))
+                FileStorage.__objects[key] = obj
+                self.__index(key, obj)
+        return obj
+
+    def count(self, cls=None):
+        """Returns the number of objects of cls (default every class)"""
+        self.__sync_indexes()
+        if cls is None:
+            return len(FileStorage.__objects) + \
+                sum(map(len, FileStorage.__raw.values()))
+        total = 0
+        for index in (FileStorage.__by_class, FileStorage.__raw):
+            for obj_cls, objs in index.items():
+                if issubclass(obj_cls, cls):
+                    total += len(objs)
+        return total
+
+    def iter_all(self, cls=None, since=None):
+        """Yields the objects of cls (default every class) one at a time
+
+        With since (a datetime), only objects updated after it are given.
+        """
+        self.__materialize(cls)
+        if cls is None:
+            objs = list(FileStorage.__objects.values())
+        else:
+            objs = [obj for obj_cls, by_key in
+                    list(FileStorage.__by_class.items())
+                    if issubclass(obj_cls, cls) for obj in by_key.values()]
+        if since is None:
+            yield from objs
+            return
+        for obj in objs:
+            if obj.updated_at > since:
+                yield obj
+
     def new(self, obj):
         """Adds new object to storage dictionary"""
-        self.all().update({obj.to_dict()['__class__'] + '.' + obj.id: obj})
+        key = obj.storage_key
+        self.__sync_indexes()
+        FileStorage.__generation += 1
+        FileStorage.__seq += 1
+        obj.__dict__['change_seq'] = FileStorage.__seq
+        raw = FileStorage.__raw.get(type(obj), {}).pop(key, None)
+        if self.__log:
+            existed = raw is not None or key in FileStorage.__objects
+            FileStorage.__changes.append(
+                [FileStorage.__seq, 'updated' if existed else 'created', key])
+        FileStorage.__members.pop(key, None)
+        FileStorage.__objects[key] = obj
+        self.__index(key, obj)
+        FileStorage.__pending.add(key)
+
+    def new_many(self, objs):
+        """Adds every object of the iterable objs, returns how many
+
+        Nothing is written; wrap the call in batch() or call save().
+        """
+        count = 0
+        for obj in objs:
+            self.new(obj)
+            count += 1
+        return count
 
     def save(self):
         """Saves storage dictionary to file"""
-        with open(FileStorage.__file_path, 'w') as f:
-            temp = {}
-            temp.update(FileStorage.__objects)
-            for key, val in temp.items():
-                temp[key] = val.to_dict()
-            json.dump(temp, f)
+        if self.__batch_depth:
+            return
+        if self.__journal:
+            self.__append_journal()
+        else:
+            self.__write_snapshot()
+        self.__append_changes()
+
+    @contextmanager
+    def batch(self):
+        """Coalesces every save() made inside the block into one write
+
+        If the block or the final save raises, in-memory changes are
+        discarded by reloading the last saved state and the exception
+        propagates.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__batch_depth -= 1
+            if not self.__batch_depth:
+                self.reload()
+            raise
+        self.__batch_depth -= 1
+        if not self.__batch_depth:
+            try:
+                self.save()
+            except BaseException:
+                self.reload()
+                raise
+
+    def touch(self, obj):
+        """Marks obj as changed so the next snapshot re-encodes it, and
+        when journaling, so the next save() appends a record for it"""
+        FileStorage.__generation += 1
+        obj_id = obj.__dict__.get('id')
+        if obj_id is None:
+            return
+        key = type(obj).__name__ + '.' + obj_id
+        if FileStorage.__members:
+            FileStorage.__members.pop(key, None)
+        if self.__journal and key in FileStorage.__objects:
+            FileStorage.__pending.add(key)
 
     def delete(self, obj=None):
         """Deletes obj from __objects if it's inside
@@ -40,13 +259,178 @@ class FileStorage:
             obj (obj, optional): Object to delete
         """
         if obj is not None:
-            key = obj.to_dict()['__class__'] + '.' + obj.id
-            if key in FileStorage.__objects:
+            key = obj.storage_key
+            self.__sync_indexes()
+            FileStorage.__generation += 1
+            FileStorage.__members.pop(key, None)
+            if FileStorage.__raw.get(type(obj), {}).pop(key, None):
+                self.__deleted(key)
+            elif key in FileStorage.__objects:
                 del FileStorage.__objects[key]
-                self.save()
+                self.__unindex(key, obj)
+                self.__deleted(key)
+
+    def __deleted(self, key):
+        """Records the removal of key and saves"""
+        FileStorage.__seq += 1
+        if self.__log:
+            FileStorage.__changes.append([FileStorage.__seq, 'deleted', key])
+        FileStorage.__pending.add(key)
+        self.save()
 
     def reload(self):
-        """Loads storage dictionary from file"""
+        """Loads storage dictionary from file, then replays the journal"""
+        classes = self.__classes()
+        FileStorage.__objects = {}
+        FileStorage.__raw = {}
+        FileStorage.__shapes = {}
+        FileStorage.__pending = set()
+        FileStorage.__generation += 1
+        FileStorage.__seq = 0
+        FileStorage.__changes = []
+        FileStorage.__members = {}
+        self.__sync_indexes()
+        path = FileStorage.__file_path
+        try:
+            self.__read_snapshot(path, classes)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            if not (self.__checksum and os.path.exists(path + '.bak')):
+                raise
+            FileStorage.__objects = {}
+            FileStorage.__raw = {}
+            self.__sync_indexes()
+            self.__read_snapshot(path + '.bak', classes)
+        for key, val_dict in self.__read_journal():
+            if val_dict is None:
+                FileStorage.__objects.pop(key, None)
+                for raw in FileStorage.__raw.values():
+                    raw.pop(key, None)
+            else:
+                self.__load(key, classes[val_dict['__class__']], val_dict)
+        for seq, _, _ in self.__read_changes(FileStorage.__seq):
+            FileStorage.__seq = seq
+        self.__sync_indexes()
+
+    def lookup(self, cls, attr, value):
+        """Returns a dictionary of cls instances whose attr equals value
+
+        Foreign keys (state_id, city_id, place_id, user_id) are answered
+        from a reverse index as of the objects' last new()/save(); other
+        attributes fall back to scanning all(cls). For list attributes
+        (amenity_ids) this returns the instances whose list holds value.
+        """
+        if attr in FileStorage.__member_keys:
+            self.__materialize(cls)
+            bucket = FileStorage.__by_fk.get((attr, value), {})
+            return {key: obj for key, obj in bucket.items()
+                    if isinstance(obj, cls) and value in getattr(obj, attr)}
+        if attr not in FileStorage.__foreign_keys:
+            return {key: obj for key, obj in self.all(cls).items()
+                    if getattr(obj, attr, None) == value}
+        self.__materialize(cls)
+        bucket = FileStorage.__by_fk.get((attr, value), {})
+        return {key: obj for key, obj in bucket.items()
+                if isinstance(obj, cls) and getattr(obj, attr) == value}
+
+    def query(self, cls):
+        """Returns a Query over cls objects, see models.engine.query"""
+        return Query(cls, self.__run_query, self.__count_query)
+
+    def __run_query(self, query):
+        """Runs query over the objects of its class
+
+        The objects __match() keeps are sorted, then the keyset bound and
+        the page are applied in Python.
+        """
+        objs = self.__match(query)
+        keys = query.keys()
+        # NULLs first when ascending, like MySQL
+        for attr, descending in reversed(keys):
+            objs.sort(key=lambda obj: _sort_key(getattr(obj, attr, None)),
+                      reverse=descending)
+        if query.bound is not None:
+            objs = [obj for obj in objs
+                    if _sorts_after(obj, query.bound, keys)]
+        end = None
+        if query.limit_count is not None:
+            end = query.offset_count + query.limit_count
+        return objs[query.offset_count:end]
+
+    def __count_query(self, query):
+        """Counts the objects of query, sorting them only for a page"""
+        if query.bound is None and query.limit_count is None \
+                and not query.offset_count:
+            return len(self.__match(query))
+        return len(self.__run_query(query))
+
+    def __match(self, query):
+        """Returns the objects of the query's class its filters keep
+
+        An equality filter on a foreign key or amenity_ids narrows the
+        candidates through the reverse index; the other filters are then
+        applied in Python.
+        """
+        objs = None
+        indexed = FileStorage.__foreign_keys + FileStorage.__member_keys
+        for attr, op, value in query.filters:
+            if op == 'eq' and attr in indexed:
+                objs = self.lookup(query.cls, attr, value).values()
+                break
+        if objs is None:
+            objs = self.iter_all(query.cls)
+        filters = []
+        for attr, op, value in query.filters:
+            test = OPERATORS[op]
+            if op == 'eq' and attr in FileStorage.__member_keys:
+                # amenity_ids=X means "holds X", as in lookup()
+                test = operator.contains
+            elif op not in ('eq', 'in'):
+                test = _not_null(test)
+            filters.append((attr, test, value))
+        return [obj for obj in objs
+                if all(test(getattr(obj, attr, None), value)
+                       for attr, test, value in filters)]
+
+    def changes_since(self, cursor=0):
+        """Yields (seq, op, key, obj) for each change saved after cursor
+
+        op is 'created', 'updated' or 'deleted'; obj is the object as it
+        is now, or None once it is gone. Pass the last seq seen as the
+        next cursor. Needs HBNB_CHANGE_LOG=1 when the changes were made.
+        """
+        classes = self.__classes()
+        for seq, op, key in self.__read_changes(cursor):
+            obj = None
+            if op != 'deleted':
+                name, _, obj_id = key.partition('.')
+                obj = self.get(classes[name], obj_id)
+            yield seq, op, key, obj
+
+    def view(self, key, build):
+        """Returns build(), reused until storage next changes
+
+        key names the value, e.g. (state.storage_key, 'cities'). Every
+        new(), delete(), reload() or model attribute write starts a new
+        generation, which empties the cache.
+        """
+        self.__sync_indexes()
+        if FileStorage.__views_at != FileStorage.__generation:
+            FileStorage.__views = {}
+            FileStorage.__views_at = FileStorage.__generation
+        try:
+            return FileStorage.__views[key]
+        except KeyError:
+            value = FileStorage.__views[key] = build()
+            return value
+
+    def close(self):
+        """Call reload() method for deserializing the JSON file to objects"""
+        self.reload()
+
+    def __classes(self):
+        """Returns the model classes by name"""
         from models.base_model import BaseModel
         from models.user import User
         from models.place import Place
@@ -55,21 +439,291 @@ class FileStorage:
         from models.amenity import Amenity
         from models.review import Review
 
-        classes = {
+        return {
             'BaseModel': BaseModel, 'User': User, 'Place': Place,
             'State': State, 'City': City, 'Amenity': Amenity,
             'Review': Review
         }
+
+    def __load(self, key, cls, val_dict):
+        """Stores a decoded record, as a model or raw in lazy mode"""
+        seq = val_dict.get('change_seq')
+        if seq is not None and seq > FileStorage.__seq:
+            FileStorage.__seq = seq
+        if self.__lazy:
+            FileStorage.__objects.pop(key, None)
+            if self.__compact:
+                val_dict = self.__pack(val_dict)
+            FileStorage.__raw.setdefault(cls, {})[key] = val_dict
+        else:
+            FileStorage.__objects[key] = cls.from_storage(val_dict)
+
+    def __materialize(self, cls=None):
+        """Builds the raw records of cls (or all of them) into models"""
+        self.__sync_indexes()
+        for raw_cls in list(FileStorage.__raw):
+            if cls is None or issubclass(raw_cls, cls):
+                for key, val_dict in FileStorage.__raw.pop(raw_cls).items():
+                    obj = raw_cls.from_storage(self.__unpack(val_dict))
+                    FileStorage.__objects[key] = obj
+                    self.__index(key, obj)
+
+    def __pack(self, val_dict):
+        """Returns a raw record as a tuple of its values and key names"""
+        for name, value in val_dict.items():
+            if type(value) is str:
+                if name in ('created_at', 'updated_at'):
+                    val_dict[name] = datetime.fromisoformat(value)
+                elif name in ('id', '__class__') or name.endswith('_id'):
+                    val_dict[name] = sys.intern(value)
+        names = tuple(val_dict)
+        names = FileStorage.__shapes.setdefault(names, names)
+        return (*val_dict.values(), names)
+
+    def __unpack(self, record):
+        """Returns the dict form of a raw record, packed or not"""
+        if type(record) is dict:
+            return record
+        return dict(zip(record[-1], record))
+
+    def __sync_indexes(self):
+        """Rebuilds the indexes if __objects changed behind our back
+
+        That happens when __objects is replaced, or resized through the
+        dict returned by all() instead of new() and delete(). Raw records
+        belong to the dict they were loaded with and go away with it.
+        """
+        objects = FileStorage.__objects
+        if FileStorage.__indexed is objects and \
+                sum(map(len, FileStorage.__by_class.values())) == \
+                len(objects):
+            return
+        if FileStorage.__indexed is not objects:
+            FileStorage.__raw = {}
+            FileStorage.__members = {}
+        FileStorage.__generation += 1
+        FileStorage.__by_class = {}
+        FileStorage.__by_fk = {}
+        FileStorage.__fk_of = {}
+        FileStorage.__indexed = objects
+        for key, obj in objects.items():
+            self.__index(key, obj)
+
+    def __index(self, key, obj):
+        """Files obj under its class and current foreign key values"""
+        FileStorage.__by_class.setdefault(type(obj), {})[key] = obj
+        fks = tuple((attr, getattr(obj, attr))
+                    for attr in FileStorage.__foreign_keys
+                    if getattr(obj, attr, None) is not None)
+        for attr in FileStorage.__member_keys:
+            values = dict.fromkeys(obj.__dict__.get(attr, ()))
+            fks += tuple((attr, value) for value in values)
+        old_fks = FileStorage.__fk_of.get(key, ())
+        if fks == old_fks:
+            for fk in fks:
+                FileStorage.__by_fk[fk][key] = obj
+            return
+        self.__drop_fks(key, old_fks)
+        for fk in fks:
+            FileStorage.__by_fk.setdefault(fk, {})[key] = obj
+        FileStorage.__fk_of[key] = fks
+
+    def __unindex(self, key, obj):
+        """Removes key from every index"""
+        FileStorage.__by_class.get(type(obj), {}).pop(key, None)
+        self.__drop_fks(key, FileStorage.__fk_of.pop(key, ()))
+
+    def __drop_fks(self, key, fks):
+        """Removes key from the given foreign key buckets"""
+        for fk in fks:
+            bucket = FileStorage.__by_fk[fk]
+            bucket.pop(key, None)
+            if not bucket:
+                del FileStorage.__by_fk[fk]
+
+    def __read_snapshot(self, path, classes):
+        """Loads the snapshot at path, verifying its digest if enabled"""
+        if self.__checksum and os.path.exists(path + '.sha256'):
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            with open(path + '.sha256') as f:
+                if f.read().strip() != digest.hexdigest():
+                    raise ValueError("{} fails its checksum".format(path))
+        with open(path, 'rb') as f:
+            for key, val_dict in serializer_for(f).load(f):
+                self.__load(key, classes[val_dict['__class__']], val_dict)
+
+    def __journal_path(self):
+        """Returns the path of the write-ahead log"""
+        return FileStorage.__file_path + '.journal'
+
+    def __write_snapshot(self):
+        """Atomically replaces the file and drops the redundant journal"""
+        path = FileStorage.__file_path
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        digest = hashlib.sha256()
         try:
-            FileStorage.__objects = {}
-            with open(FileStorage.__file_path, 'r') as f:
-                temp_load_dict = json.load(f)
-                for key, val_dict in temp_load_dict.items():
-                    cls = classes[val_dict['__class__']]
-                    FileStorage.__objects[key] = cls(**val_dict)
+            with open(tmp_path, 'wb') as f:
+                for chunk in self.__snapshot_chunks():
+                    f.write(chunk)
+                    if self.__checksum:
+                        digest.update(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.__checksum:
+                self.__keep_backup(path)
+                _replace_text(path + '.sha256', digest.hexdigest())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _fsync_dir(path)
+        FileStorage.__pending = set()
+        try:
+            os.remove(self.__journal_path())
         except FileNotFoundError:
             pass
 
-    def close(self):
-        """Call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+    def __snapshot_chunks(self, batch=4096):
+        """Yields the encoded snapshot, batch members at a time"""
+        self.__sync_indexes()
+        serializer = self.__serializer
+        count = len(FileStorage.__objects) + \
+            sum(map(len, FileStorage.__raw.values()))
+        yield serializer.begin(count)
+        sep, lead, chunk = serializer.separator, b'', []
+        for encoded in self.__encoded_members(serializer):
+            chunk.append(encoded)
+            if len(chunk) == batch:
+                yield lead + sep.join(chunk)
+                lead, chunk = sep, []
+        if chunk:
+            yield lead + sep.join(chunk)
+        yield serializer.end(count)
+
+    def __encoded_members(self, serializer):
+        """Yields every member, reusing the encoding of unchanged objects
+
+        Only objects touched since they were last encoded go through the
+        serializer; the rest come straight from __members.
+        """
+        member, record = serializer.member, serializer.record
+        for raw in FileStorage.__raw.values():
+            for key, val_dict in raw.items():
+                yield member(key, self.__unpack(val_dict))
+        if not self.__cache:
+            for key, val in FileStorage.__objects.items():
+                yield member(key, record(val))
+            return
+        if FileStorage.__members_format != serializer.name:
+            FileStorage.__members = {}
+            FileStorage.__members_format = serializer.name
+        members = FileStorage.__members
+        for key, val in FileStorage.__objects.items():
+            encoded = members.get(key)
+            if encoded is None:
+                encoded = members[key] = member(key, record(val))
+            yield encoded
+
+    def __keep_backup(self, path):
+        """Keeps the current snapshot and its digest as path.bak"""
+        if not os.path.exists(path):
+            return
+        tmp_path = '{}.bak.{}.tmp'.format(path, os.getpid())
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, path + '.bak')
+        if os.path.exists(path + '.sha256'):
+            with open(path + '.sha256') as f:
+                _replace_text(path + '.bak.sha256', f.read())
+
+    def __append_journal(self):
+        """Appends one record per pending key, compacting when too large"""
+        if not FileStorage.__pending:
+            return
+        lines = []
+        for key in FileStorage.__pending:
+            obj = FileStorage.__objects.get(key)
+            value = obj.to_dict() if obj is not None else None
+            lines.append(json.dumps({'key': key, 'value': value}) + '\n')
+        with open(self.__journal_path(), 'a') as f:
+            f.write(''.join(lines))
+            size = f.tell()
+        FileStorage.__pending = set()
+
+        try:
+            snapshot_size = os.path.getsize(FileStorage.__file_path)
+        except FileNotFoundError:
+            snapshot_size = 0
+        if size > self.__journal_max and size > snapshot_size:
+            self.__write_snapshot()
+
+    def __changes_path(self):
+        """Returns the path of the change log"""
+        return FileStorage.__file_path + '.changes'
+
+    def __append_changes(self):
+        """Appends the changes recorded since the last save to the log"""
+        if not (self.__log and FileStorage.__changes):
+            return
+        lines = [json.dumps(change) + '\n' for change in FileStorage.__changes]
+        with open(self.__changes_path(), 'a') as f:
+            f.write(''.join(lines))
+        FileStorage.__changes = []
+
+    def __read_changes(self, cursor):
+        """Yields the logged [seq, op, key] entries with seq > cursor
+
+        The log is sorted by seq, so the first wanted line is found by a
+        binary search over byte offsets and older lines are never decoded.
+        A torn last line is ignored, as in the journal.
+        """
+        try:
+            f = open(self.__changes_path(), 'rb')
+        except FileNotFoundError:
+            return
+
+        def line_at(offset):
+            """Returns the first whole line starting at or after offset"""
+            f.seek(max(offset - 1, 0))
+            if offset:
+                f.readline()
+            line = f.readline()
+            return line if line.endswith(b'\n') else b''
+
+        with f:
+            lo, hi = 0, os.fstat(f.fileno()).st_size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                line = line_at(mid)
+                if not line or json.loads(line)[0] > cursor:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            line = line_at(lo)
+            while line:
+                yield json.loads(line)
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    return
+
+    def __read_journal(self):
+        """Yields (key, dict or None) records from the journal
+
+        A torn last line left by a crash during an append is ignored.
+        """
+        try:
+            f = open(self.__journal_path(), 'r')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if not line.endswith('\n'):
+                    return
+                record = json.loads(line)
+                yield record['key'], record['value']
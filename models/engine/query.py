@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""This module defines the query builder shared by both storage engines
+
+storage.query(cls) returns a Query. Each call below returns a new Query,
+so a base query can be kept and refined:
+
+    filter(name=..., price_by_night__lte=...)   lookups joined with AND
+    order_by('name', '-price_by_night')         '-' sorts descending
+    limit(n), offset(n)                         classic pagination
+    after(obj)                                  keyset pagination: only
+                                                rows sorted after obj
+    eager('cities')                             DBStorage loader hints
+
+Lookups are attr (equals), attr__ne, __lt, __lte, __gt, __gte and __in.
+Rows are always ordered with id as the last key, so pages are stable and
+after(last object of a page) gives the next page without skipping rows.
+The storage engine runs the query when it is iterated, or through all(),
+first() or count(); engines may count without loading the objects.
+"""
+import operator
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'in': lambda value, values: value in values,
+}
+
+
+class Query:
+    """A selection of cls objects, run by the storage that built it"""
+
+    def __init__(self, cls, run, count=None):
+        """Starts a query over cls; run(query) returns the matching list
+
+        count(query), when given, returns how many objects run would.
+        """
+        self.cls = cls
+        self.filters = ()
+        self.ordering = ()
+        self.bound = None
+        self.limit_count = None
+        self.offset_count = 0
+        self.eager_names = ()
+        self.__run = run
+        self.__count = count
+
+    def __refine(self, **changes):
+        """Returns a copy of this query with some fields replaced"""
+        query = Query(self.cls, self.__run, self.__count)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        return query
+
+    def filter(self, **lookups):
+        """Keeps the objects matching every attr[__op]=value lookup"""
+        filters = list(self.filters)
+        for lookup, value in lookups.items():
+            attr, _, op = lookup.partition('__')
+            if op and op not in OPERATORS:
+                raise ValueError("Unknown lookup '{}'".format(lookup))
+            filters.append((attr, op or 'eq', value))
+        return self.__refine(filters=tuple(filters))
+
+    def order_by(self, *names):
+        """Sorts by the given attributes; '-name' sorts descending"""
+        ordering = tuple((name.lstrip('-'), name.startswith('-'))
+                         for name in names)
+        return self.__refine(ordering=ordering)
+
+    def keys(self):
+        """Returns the (attr, descending) pairs rows are sorted by"""
+        if any(attr == 'id' for attr, _ in self.ordering):
+            return self.ordering
+        return self.ordering + (('id', False),)
+
+    def after(self, obj):
+        """Keeps the objects sorted after obj, e.g. the last of a page"""
+        bound = tuple(getattr(obj, attr) for attr, _ in self.keys())
+        return self.__refine(bound=bound)
+
+    def limit(self, count):
+        """Returns at most count objects"""
+        return self.__refine(limit_count=count)
+
+    def offset(self, count):
+        """Skips the first count objects"""
+        return self.__refine(offset_count=count)
+
+    def eager(self, *names):
+        """Loads these relationships with the rows, see DBStorage.all()"""
+        return self.__refine(eager_names=self.eager_names + names)
+
+    def all(self):
+        """Returns the matching objects as a list"""
+        return self.__run(self)
+
+    def first(self):
+        """Returns the first matching object, or None"""
+        objs = self.limit(1).all()
+        return objs[0] if objs else None
+
+    def count(self):
+        """Returns the number of matching objects"""
+        if self.__count is None:
+            return len(self.all())
+        return self.__count(self)
+
+    def __iter__(self):
+        """Iterates over the matching objects"""
+        return iter(self.all())
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+"""This module defines the on-disk formats FileStorage can write
+
+A serializer turns the store into a header, one member per object and a
+footer, and streams (key, dict) pairs back out of a file. The format is
+chosen with the HBNB_FILE_FORMAT environment variable:
+
+    json     stdlib json, the default
+    orjson   json encoded with orjson (pip install orjson)
+    msgpack  binary MessagePack with native timestamps (pip install msgpack)
+
+Files are read according to their first byte, not the current setting, so
+a store written in one format still loads after switching to another.
+"""
+import io
+import json
+from datetime import datetime, timezone
+
+
+def _iter_json_items(f, chunk_size=1 << 16):
+    """Yields the (key, value) pairs of the JSON object in file f
+
+    The object is decoded one member at a time from chunk_size reads, so
+    the whole document never has to sit in memory as text or as a dict.
+    Malformed or empty input raises ValueError like json.load().
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        """Drops the consumed prefix and reads one more chunk"""
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+        return not eof
+
+    def skip_to_token():
+        """Moves pos to the next non-blank character, reading if needed"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buf) or not fill():
+                return buf[pos:pos + 1]
+
+    def decode():
+        """Decodes the value at pos, reading more until it is complete"""
+        nonlocal pos
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buf, pos)
+                return value
+            except ValueError:
+                if not fill():
+                    raise
+
+    def expect(char):
+        """Consumes char or raises ValueError"""
+        nonlocal pos
+        if skip_to_token() != char:
+            raise json.JSONDecodeError("Expecting '{}'".format(char),
+                                       buf, pos)
+        pos += 1
+
+    def finish():
+        """Consumes the closing brace and checks nothing follows it"""
+        nonlocal pos
+        pos += 1
+        if skip_to_token():
+            raise json.JSONDecodeError("Extra data", buf, pos)
+
+    expect('{')
+    if skip_to_token() == '}':
+        return finish()
+    while True:
+        skip_to_token()
+        key = decode()
+        expect(':')
+        skip_to_token()
+        yield key, decode()
+        if skip_to_token() == '}':
+            return finish()
+        expect(',')
+
+
+def _isoformat(value):
+    """json default= hook for datetimes read from a msgpack file"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+class JSONSerializer:
+    """Stdlib json, one object per member of a top-level JSON object"""
+    name = 'json'
+    separator = b', '
+
+    def begin(self, count):
+        """Returns the bytes opening a file of count members"""
+        return b'{'
+
+    def end(self, count):
+        """Returns the bytes closing a file of count members"""
+        return b'}'
+
+    def record(self, obj):
+        """Returns the dict stored for obj"""
+        return obj.to_dict()
+
+    def member(self, key, record):
+        """Returns the encoded key: record member"""
+        return (json.dumps(key) + ': ' +
+                json.dumps(record, default=_isoformat)).encode()
+
+    def load(self, f):
+        """Yields (key, dict) pairs from the binary file f"""
+        return _iter_json_items(io.TextIOWrapper(f, encoding='utf-8'))
+
+
+class ORJSONSerializer(JSONSerializer):
+    """JSON encoded with orjson; files stay readable by JSONSerializer"""
+    name = 'orjson'
+
+    def __init__(self):
+        """Imports orjson, which is an optional dependency"""
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("HBNB_FILE_FORMAT=orjson needs "
+                              "'pip install orjson'") from None
+        self.__dumps = orjson.dumps
+
+    def member(self, key, record):
+        """Returns the encoded key: record member"""
+        return self.__dumps(key) + b': ' + self.__dumps(record)
+
+
+class MsgpackSerializer:
+    """One MessagePack map with timestamps stored as native datetimes
+
+    Model datetimes are naive, so they are written as msgpack Timestamps
+    taken as UTC and read back naive with the same wall-clock value.
+    """
+    name = 'msgpack'
+    separator = b''
+
+    def __init__(self):
+        """Imports msgpack, which is an optional dependency"""
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("HBNB_FILE_FORMAT=msgpack needs "
+                              "'pip install msgpack'") from None
+        self.__msgpack = msgpack
+        self.__packer = msgpack.Packer(datetime=True, default=self.__naive)
+
+    def __naive(self, value):
+        """Packs naive datetimes, which msgpack refuses on its own"""
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return self.__msgpack.Timestamp.from_datetime(
+                value.replace(tzinfo=timezone.utc))
+        raise TypeError("can not serialize {!r}".format(value))
+
+    def begin(self, count):
+        """Returns the map header for count members"""
+        return self.__packer.pack_map_header(count)
+
+    def end(self, count):
+        """Returns the bytes closing a file of count members"""
+        return b''
+
+    def record(self, obj):
+        """Returns the dict stored for obj, with native datetimes"""
+        record = obj.to_dict()
+        record['created_at'] = obj.created_at
+        record['updated_at'] = obj.updated_at
+        return record
+
+    def member(self, key, record):
+        """Returns the encoded key and record"""
+        return self.__packer.pack(key) + self.__packer.pack(record)
+
+    def load(self, f):
+        """Yields (key, dict) pairs from the binary file f"""
+        msgpack = self.__msgpack
+        unpacker = msgpack.Unpacker(f, timestamp=3)
+        try:
+            for _ in range(unpacker.read_map_header()):
+                key = unpacker.unpack()
+                record = unpacker.unpack()
+                for name in ('created_at', 'updated_at'):
+                    value = record.get(name)
+                    if isinstance(value, datetime):
+                        record[name] = value.replace(tzinfo=None)
+                yield key, record
+        except msgpack.OutOfData:
+            raise ValueError("Truncated msgpack map") from None
+        try:
+            unpacker.unpack()
+        except msgpack.OutOfData:
+            return
+        raise ValueError("Extra data after msgpack map")
+
+
+SERIALIZERS = {
+    'json': JSONSerializer,
+    'orjson': ORJSONSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def get_serializer(name=None):
+    """Returns an instance of the serializer called name (default json)"""
+    try:
+        return SERIALIZERS[name or 'json']()
+    except KeyError:
+        raise ValueError("Unknown HBNB_FILE_FORMAT '{}', expected one of "
+                         "{}".format(name, ', '.join(SERIALIZERS))) from None
+
+
+def serializer_for(f):
+    """Returns the serializer able to read the binary file f"""
+    first = f.peek(1)[:1]
+    if first and (0x80 <= first[0] <= 0x8f or first[0] in (0xde, 0xdf)):
+        return MsgpackSerializer()
+    return JSONSerializer()
@@ -3,23 +3,15 @@
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.orm import relationship
-import os
 
 
 class Review(BaseModel, Base):
     """ Review classto store review information """
     __tablename__ = 'reviews'
     text = Column(String(1024), nullable=False)
-    place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
-    user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+    place_id = Column(String(60), ForeignKey('places.id'), nullable=False,
+                      index=True)
+    user_id = Column(String(60), ForeignKey('users.id'), nullable=False,
+                     index=True)
 
-    def __init__(self, *args, **kwargs):
-        """Initializes Review instance"""
-        super().__init__(*args, **kwargs)
-        if os.getenv('HBNB_TYPE_STORAGE') != 'db':
-            if 'text' not in kwargs:
-                self.text = ""
-            if 'place_id' not in kwargs:
-                self.place_id = ""
-            if 'user_id' not in kwargs:
-                self.user_id = ""
+    _file_defaults = {'text': "", 'place_id': "", 'user_id': ""}
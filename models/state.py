@@ -10,14 +10,9 @@ from models.city import City
 class State(BaseModel, Base):
     """ State class """
     __tablename__ = 'states'
-    name = Column(String(128), nullable=False)
+    name = Column(String(128), nullable=False, index=True)
 
-    def __init__(self, *args, **kwargs):
-        """Initializes State instance"""
-        super().__init__(*args, **kwargs)
-        if os.getenv('HBNB_TYPE_STORAGE') != 'db':
-            if 'name' not in kwargs:
-                self.name = ""
+    _file_defaults = {'name': ""}
 
     if os.getenv('HBNB_TYPE_STORAGE') == 'db':
         cities = relationship("City", backref="state",
@@ -28,9 +23,7 @@ class State(BaseModel, Base):
             """Returns the list of City instances with state_id
             equals to the current State.id"""
             from models import storage
-            city_list = []
-            all_cities = storage.all(City)
-            for city in all_cities.values():
-                if city.state_id == self.id:
-                    city_list.append(city)
-            return city_list
+            key = (self.storage_key, 'cities')
+            cities = storage.view(key, lambda: list(
+                storage.lookup(City, 'state_id', self.id).values()))
+            return list(cities)
@@ -3,7 +3,6 @@
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
-import os
 
 
 class User(BaseModel, Base):
@@ -18,15 +17,5 @@ class User(BaseModel, Base):
     reviews = relationship("Review", backref="user",
                            cascade="all, delete-orphan")
 
-    def __init__(self, *args, **kwargs):
-        """Initializes User instance"""
-        super().__init__(*args, **kwargs)
-        if os.getenv('HBNB_TYPE_STORAGE') != 'db':
-            if 'email' not in kwargs:
-                self.email = ""
-            if 'password' not in kwargs:
-                self.password = ""
-            if 'first_name' not in kwargs:
-                self.first_name = ""
-            if 'last_name' not in kwargs:
-                self.last_name = ""
+    _file_defaults = {'email': "", 'password': "",
+                      'first_name': "", 'last_name': ""}
@@ -4,7 +4,8 @@ import unittest
 from unittest.mock import patch
 from io import StringIO
 import os
-from console import HBNBCommand
+from console import (HBNBCommand, parse_dot_call, parse_literal,
+                     parse_params)
 from models.engine.file_storage import FileStorage
 from models.state import State
 from models.place import Place
@@ -142,6 +143,21 @@ class TestConsole(unittest.TestCase):
             output = f.getvalue().strip()
         self.assertEqual(output, "[]")
 
+    def test_all_matches_list_repr(self):
+        """Test that streamed all output equals printing the list."""
+        with patch('sys.stdout', new=StringIO()):
+            self.console.onecmd('create State name="Kigali"')
+            self.console.onecmd('create City name="Huye"')
+            self.console.onecmd('create BaseModel')
+        objs = list(FileStorage._FileStorage__objects.values())
+        for command, expected in (("all", objs),
+                                  ("all State", objs[:1]),
+                                  ("all BaseModel", objs[2:])):
+            with patch('sys.stdout', new=StringIO()) as f:
+                self.console.onecmd(command)
+            self.assertEqual(f.getvalue().strip(),
+                             str([str(obj) for obj in expected]))
+
     def test_all_invalid_class(self):
         """Test all command with invalid class name."""
         with patch('sys.stdout', new=StringIO()) as f:
@@ -184,6 +200,246 @@ class TestConsole(unittest.TestCase):
             output = f.getvalue().strip()
         self.assertEqual(output, "0")
 
+    def test_where_predicates(self):
+        """Test all and count keep objects matching every predicate."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create Place name="Big_loft" '
+                                'price_by_night=150 max_guest=4')
+            self.console.onecmd('create Place name="Hut" price_by_night=40')
+            self.console.onecmd('create Place name="Tent"')
+        big, hut, _ = f.getvalue().split()
+        for line, expected in (("count Place price_by_night>100", "1"),
+                               ("count Place price_by_night<=150", "3"),
+                               ("count Place price_by_night!=40", "2"),
+                               ("count Place name=Big_loft", "1"),
+                               ('count Place "name=Big loft" max_guest>=4',
+                                "1"),
+                               ("count Place price_by_night>100 max_guest<4",
+                                "0"),
+                               ("count BaseModel id=" + big, "0")):
+            with patch('sys.stdout', new=StringIO()) as f:
+                self.console.onecmd(line)
+            self.assertEqual(f.getvalue().strip(), expected, line)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("all Place price_by_night<100")
+        self.assertIn(hut, f.getvalue())
+        self.assertNotIn(big, f.getvalue())
+
+    def test_where_column_types(self):
+        """Test predicates on timestamp and change_seq columns."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create Place name="Loft"')
+        place_id = f.getvalue().strip()
+        for line, expected in (("count Place change_seq>0", "1"),
+                               ("count Place created_at>2020-01-01", "1"),
+                               ("count Place updated_at<2020-01-01T10:00",
+                                "0"),
+                               ("count Place created_at>now",
+                                "** invalid value: created_at>now **"),
+                               ("count Place change_seq>=x",
+                                "** invalid value: change_seq>=x **")):
+            with patch('sys.stdout', new=StringIO()) as f:
+                self.console.onecmd(line)
+            self.assertEqual(f.getvalue().strip(), expected, line)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("all Place created_at>2020-01-01")
+        self.assertIn(place_id, f.getvalue())
+        # a stored value of another type than its column
+        FileStorage().get(Place, place_id).__dict__['max_guest'] = "x"
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("all Place max_guest>1")
+            self.console.onecmd("count Place max_guest>1")
+        self.assertEqual(f.getvalue(), "** invalid value **\n" * 2)
+
+    def test_where_errors(self):
+        """Test that malformed predicates are reported."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("count Place price_by_night")
+            self.console.onecmd("all Place colour=red")
+            self.console.onecmd("count Place price_by_night>cheap")
+            self.console.onecmd("all Nope name=x")
+        self.assertEqual(f.getvalue().strip().split("\n"),
+                         ["** invalid predicate: price_by_night **",
+                          "** attribute doesn't exist: colour **",
+                          "** invalid value: price_by_night>cheap **",
+                          "** class doesn't exist **"])
+
+    def test_show_destroy_count(self):
+        """Test show, count and destroy on an existing object."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create State name="Kigali"')
+            self.console.onecmd('create BaseModel')
+        state_id = f.getvalue().split()[0]
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("show State " + state_id)
+        self.assertIn("[State] ({})".format(state_id), f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("count BaseModel")
+            self.console.onecmd("State.count()")
+        self.assertEqual(f.getvalue().split(), ["1", "1"])
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("destroy State " + state_id)
+            self.console.onecmd("count State")
+            self.console.onecmd("show State " + state_id)
+        self.assertEqual(f.getvalue().strip().split("\n"),
+                         ["0", "** no instance found **"])
+
+    def test_load_jsonl(self):
+        """Test load creates valid JSON lines and reports the others."""
+        import tempfile
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl',
+                                         delete=False) as src:
+            src.write('{"name": "Kigali"}\n\n{"name": "Huye"}\n'
+                      '{"nmae": "typo"}\n[1]\nnot json\n')
+        self.addCleanup(os.remove, src.name)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("load State " + src.name)
+        lines = f.getvalue().strip().split("\n")
+        self.assertEqual(lines[:2], ["** line 4: unknown attribute nmae **",
+                                     "** line 5: not a JSON object **"])
+        self.assertTrue(lines[2].startswith("** line 6: "))
+        self.assertTrue(lines[3].startswith("2 State loaded in "))
+        self.assertIn("rows/s", lines[3])
+        names = sorted(s.name for s in FileStorage().all(State).values())
+        self.assertEqual(names, ["Huye", "Kigali"])
+
+    def test_load_csv(self):
+        """Test load converts typed CSV columns."""
+        import tempfile
+        with tempfile.NamedTemporaryFile('w', suffix='.csv',
+                                         delete=False) as src:
+            src.write('name,number_rooms,latitude\nLoft,3,1.5\nHut,,\n')
+        self.addCleanup(os.remove, src.name)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("load Place " + src.name)
+        self.assertTrue(f.getvalue().startswith("2 Place loaded"))
+        places = {p.name: p for p in FileStorage().all(Place).values()}
+        self.assertEqual(places["Loft"].number_rooms, 3)
+        self.assertEqual(places["Loft"].latitude, 1.5)
+        self.assertEqual(places["Hut"].number_rooms, 0)
+
+    def test_load_value_types(self):
+        """Test load converts values to column types or rejects the line."""
+        import tempfile
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl',
+                                         delete=False) as src:
+            src.write('{"name": "bad", "created_at": 5}\n'
+                      '{"name": "bad", "number_rooms": "abc"}\n'
+                      '{"name": "bad", "amenity_ids": "xyz"}\n'
+                      '{"name": "bad", "latitude": true}\n'
+                      '{"name": "ok", "number_rooms": "2", "latitude": 3,'
+                      ' "created_at": "2020-01-01T00:00:00"}\n')
+        self.addCleanup(os.remove, src.name)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("load Place " + src.name)
+        lines = f.getvalue().strip().split("\n")
+        self.assertEqual(lines[:4],
+                         ["** line 1: created_at must be an ISO 8601 time **",
+                          "** line 2: number_rooms must be an integer **",
+                          "** line 3: amenity_ids must be a list of ids **",
+                          "** line 4: latitude must be a number **"])
+        self.assertTrue(lines[4].startswith("1 Place loaded"), lines[4])
+        place, = FileStorage().all(Place).values()
+        self.assertEqual((place.number_rooms, place.latitude,
+                          place.created_at.year), (2, 3.0, 2020))
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create State name="X"')
+        self.assertEqual(len(f.getvalue().split()), 1, f.getvalue())
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertIn('"X"', f.read())
+
+    def test_load_errors(self):
+        """Test load argument errors."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("load")
+            self.console.onecmd("load Nope x")
+            self.console.onecmd("load State")
+        self.assertEqual(f.getvalue().strip().split("\n"),
+                         ["** class name missing **",
+                          "** class doesn't exist **",
+                          "** file name missing **"])
+
+    def test_export_jsonl(self):
+        """Test export streams one JSON object per line."""
+        import json
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create State name="Kigali"')
+            self.console.onecmd('create City name="Huye"')
+        state_id = f.getvalue().split()[0]
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export State")
+        records = [json.loads(line) for line in f.getvalue().splitlines()]
+        self.assertEqual([(r['__class__'], r['id'], r['name'])
+                          for r in records], [("State", state_id, "Kigali")])
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export")
+        self.assertEqual(len(f.getvalue().splitlines()), 2)
+
+    def test_export_since(self):
+        """Test export --since keeps recently updated objects."""
+        from datetime import datetime, timedelta
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create State name="Kigali"')
+        old = FileStorage().get(State, f.getvalue().split()[0])
+        old.updated_at = datetime(2000, 1, 1)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create State name="Huye"')
+            cutoff = (datetime(2001, 1, 1)).isoformat()
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export State --since " + cutoff)
+        self.assertEqual(len(f.getvalue().splitlines()), 1)
+        self.assertIn('"Huye"', f.getvalue())
+        later = (datetime.utcnow() + timedelta(days=1)).isoformat() + "Z"
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export --since " + later)
+        self.assertEqual(f.getvalue(), "")
+
+    def test_export_csv_load(self):
+        """Test a CSV export loads back into the same objects."""
+        import tempfile
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('create Place name="Loft" number_rooms=3')
+            self.console.onecmd('create Amenity name="Wifi"')
+        place_id, amenity_id = f.getvalue().split()
+        storage = FileStorage()
+        amenity = storage.get(Amenity, amenity_id)
+        place = storage.get(Place, place_id)
+        place.amenities = amenity
+        place.save()
+        out = os.path.join(tempfile.mkdtemp(), "places.csv")
+        self.addCleanup(os.remove, out)
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export Place --format csv --output " + out)
+        self.assertEqual(f.getvalue().strip(), "1 objects exported")
+        storage.delete(place)
+        storage.save()
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("load Place " + out)
+        self.assertTrue(f.getvalue().startswith("1 Place loaded"),
+                        f.getvalue())
+        place = storage.get(Place, place_id)
+        self.assertEqual((place.name, place.number_rooms), ("Loft", 3))
+        self.assertEqual(place.amenity_ids, [amenity_id])
+        self.assertEqual(place.amenities, [amenity])
+        self.assertEqual(list(storage.lookup(Place, 'amenity_ids',
+                                             amenity_id)),
+                         ["Place." + place_id])
+
+    def test_export_errors(self):
+        """Test export argument errors."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("export Nope")
+            self.console.onecmd("export --format csv")
+            self.console.onecmd("export State --format xml")
+            self.console.onecmd("export State --since yesterday")
+            self.console.onecmd("export State --since")
+        self.assertEqual(f.getvalue().strip().split("\n"),
+                         ["** class doesn't exist **",
+                          "** class name missing **",
+                          "** format must be jsonl or csv **",
+                          "** invalid timestamp: yesterday **",
+                          "** value missing for --since **"])
+
     def test_dot_notation_all(self):
         """Test dot notation for all command."""
         with patch('sys.stdout', new=StringIO()) as f:
@@ -191,6 +447,30 @@ class TestConsole(unittest.TestCase):
             output = f.getvalue().strip()
         self.assertEqual(output, "[]")
 
+    def test_dot_notation_update_dict(self):
+        """Test dot notation update with a dictionary of attributes."""
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("create User")
+        user_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('User.update("{}", {{"first_name": "Ann", '
+                                '"age": 30}})'.format(user_id))
+            self.console.onecmd('User.update("{}", "last_name", "Lee")'
+                                .format(user_id))
+        self.assertEqual(f.getvalue(), "")
+        user = FileStorage().get(User, user_id)
+        self.assertEqual((user.first_name, user.age, user.last_name),
+                         ("Ann", 30, "Lee"))
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd('User.update("{}", {{"x": __import__("os")}})'
+                                .format(user_id))
+        self.assertIn("** invalid dictionary", f.getvalue())
+        self.assertFalse(hasattr(user, "x"))
+        with patch('sys.stdout', new=StringIO()) as f:
+            self.console.onecmd("update User {} {{[1]: 2}}".format(user_id))
+        self.assertEqual(f.getvalue(),
+                         "** invalid dictionary: unhashable dict key [1] **\n")
+
     def test_dot_notation_count(self):
         """Test dot notation for count command."""
         with patch('sys.stdout', new=StringIO()) as f:
@@ -199,5 +479,109 @@ class TestConsole(unittest.TestCase):
         self.assertEqual(output, "0")
 
 
+class TestConsoleParsing(unittest.TestCase):
+    """Test cases for the console's literal and dot syntax parsers."""
+
+    def test_parse_literal(self):
+        """Test that literals are read without evaluating code."""
+        self.assertEqual(parse_literal(
+            '{"a": 1, \'b\': [-2.5, True, None], "c\\"": {}}'),
+            {"a": 1, "b": [-2.5, True, None], 'c"': {}})
+        for text in ('__import__("os")', 'open', '{"a": 1', '{"a" 1}',
+                     '[1, 2', '{"a": 1} {}', '(1,)', ''):
+            with self.assertRaises(ValueError):
+                parse_literal(text)
+
+    def test_parse_literal_escapes(self):
+        """Test string escapes and dict keys match Python literals."""
+        self.assertEqual(parse_literal(r'{"a": "\u00e9\n", 1: "C:\\x"}'),
+                         {"a": "\u00e9\n", 1: "C:\\x"})
+        for text in (r'"\x4"', '{[1]: 2}', '{{}: 1}'):
+            with self.assertRaises(ValueError):
+                parse_literal(text)
+
+    def test_parse_params_escapes(self):
+        """Test only \\" and \\\\ are escapes in quoted create values."""
+        self.assertEqual(parse_params(r'a="C:\new_dir" b="x\"y\\z" c=1'),
+                         [("a", r"C:\new_dir", True),
+                          ("b", 'x"y\\z', True), ("c", "1", False)])
+
+    def test_parse_dot_call(self):
+        """Test the rewriting of dot calls into plain command lines."""
+        self.assertEqual(parse_dot_call('User.show("1234-5678")'),
+                         "show User 1234-5678 ")
+        self.assertEqual(parse_dot_call('User.update("1", "name", "Jo")'),
+                         'update User 1 "name" "Jo"')
+        self.assertEqual(parse_dot_call('User.update("1", {"a": "(b)"})'),
+                         'update User 1 {"a": "(b)"}')
+        self.assertIsNone(parse_dot_call('User.unknown()'))
+        self.assertIsNone(parse_dot_call('show User 1.5'))
+
+
+class TestConsoleBatch(unittest.TestCase):
+    """Test cases for the console's batch mode."""
+
+    def setUp(self):
+        """Start every test from an empty file storage."""
+        if os.path.exists(FileStorage._FileStorage__file_path):
+            os.remove(FileStorage._FileStorage__file_path)
+        FileStorage._FileStorage__objects = {}
+
+    tearDown = setUp
+
+    def run_batch(self, script, **options):
+        """Runs script in batch mode, returns (status, parsed records)."""
+        import json
+        out = StringIO()
+        status = HBNBCommand().run_batch(script.splitlines(), out=out,
+                                         **options)
+        return status, [json.loads(line) for line in
+                        out.getvalue().splitlines()]
+
+    def test_batch_records(self):
+        """Test one JSON record per command and the exit status."""
+        script = ('# setup\n'
+                  'create State name="Kigali"\n'
+                  '\n'
+                  'State.count()\n'
+                  'create Nope\n'
+                  'quit\n'
+                  'count State\n')
+        status, records = self.run_batch(script)
+        self.assertEqual(status, 1)
+        self.assertEqual([(r['line'], r['command'], r['ok'])
+                          for r in records],
+                         [(2, 'create State name="Kigali"', True),
+                          (4, "State.count()", True),
+                          (5, "create Nope", False),
+                          (6, "quit", True)])
+        self.assertEqual(records[1]['output'], ["1"])
+        self.assertEqual(records[2]['error'], "class doesn't exist")
+        status, records = self.run_batch("count State\nall State\n")
+        self.assertEqual(status, 0)
+        self.assertEqual(records[0]['output'], ["1"])
+
+    def test_batch_fail_fast(self):
+        """Test that fail_fast stops at the first failed command."""
+        status, records = self.run_batch("show State nope\ncount State\n",
+                                         fail_fast=True)
+        self.assertEqual(status, 1)
+        self.assertEqual([r['line'] for r in records], [1])
+
+    def test_batch_flushes(self):
+        """Test that saves are deferred to every flush_every commands."""
+        import models.engine.file_storage as file_storage
+        path = FileStorage._FileStorage__file_path
+        script = "create State\n" * 5
+        for flush_every, writes in ((0, 1), (2, 3)):
+            with patch.object(file_storage.os, 'replace',
+                              wraps=file_storage.os.replace) as replace:
+                status, _ = self.run_batch(script, flush_every=flush_every)
+            self.assertEqual(status, 0)
+            self.assertEqual([call.args[1] for call in replace.mock_calls
+                              ].count(path), writes)
+        self.assertEqual(FileStorage().count(State), 10)
+
+
 if __name__ == '__main__':
     unittest.main()
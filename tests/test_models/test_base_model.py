@@ -99,6 +99,12 @@ class test_basemodel(unittest.TestCase):
         n = i.to_dict()
         self.assertEqual(i.to_dict(), n)
 
+    def test_storage_key(self):
+        """ """
+        i = self.value()
+        self.assertEqual(i.storage_key, self.name + '.' + i.id)
+        self.assertEqual(i.to_dict()['__class__'], self.name)
+
     def test_kwargs_none(self):
         """ """
         n = {None: None}
@@ -111,6 +117,19 @@ class test_basemodel(unittest.TestCase):
         with self.assertRaises(KeyError):
             new = self.value(**n)
 
+    def test_from_storage(self):
+        """ """
+        i = self.value()
+        new = self.value.from_storage(i.to_dict())
+        self.assertFalse(new is i)
+        self.assertEqual(type(new), self.value)
+        self.assertEqual(new.to_dict(), i.to_dict())
+
+    def test_from_storage_invalid(self):
+        """ """
+        with self.assertRaises(KeyError):
+            self.value.from_storage({'Name': 'test'})
+
     def test_id(self):
         """ """
         new = self.value()
@@ -41,6 +41,211 @@ class TestDBStorage(unittest.TestCase):
         result = self.storage.all(State)
         self.assertIsInstance(result, dict)
 
+    def test_iter_all(self):
+        """Test that iter_all() yields the same objects as all()."""
+        self.storage.new(State(name="Streamed"))
+        self.storage.save()
+        keys = {type(obj).__name__ + "." + obj.id
+                for obj in self.storage.iter_all()}
+        self.assertEqual(keys, set(self.storage.all()))
+        states = list(self.storage.iter_all(State))
+        self.assertTrue(all(isinstance(obj, State) for obj in states))
+
+    def test_iter_all_since(self):
+        """Test that iter_all(since=) skips rows updated before since."""
+        from datetime import datetime
+        old = State(name="Old", updated_at=datetime(2000, 1, 1))
+        new = State(name="New")
+        self.storage.new(old)
+        self.storage.new(new)
+        self.storage.save()
+        ids = {obj.id for obj in
+               self.storage.iter_all(State, since=datetime(2001, 1, 1))}
+        self.assertIn(new.id, ids)
+        self.assertNotIn(old.id, ids)
+
+    def test_get_count(self):
+        """Test get() by primary key and count() per class."""
+        before = self.storage.count(State)
+        total = self.storage.count()
+        state = State(name="Counted")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertEqual(self.storage.count(State), before + 1)
+        self.assertEqual(self.storage.count(), total + 1)
+
+    def test_change_seq(self):
+        """Test that saves stamp rows with an increasing change_seq."""
+        state = State(name="Sequenced")
+        self.storage.new(state)
+        self.storage.save()
+        first = state.change_seq
+        self.assertIsNotNone(first)
+        city = City(name="Later", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertGreater(city.change_seq, first)
+        state.name = "Renamed"
+        self.storage.save()
+        self.assertGreater(state.change_seq, city.change_seq)
+
+    def test_change_seq_two_writers(self):
+        """Test that two storages on one database never share a seq."""
+        from unittest.mock import patch
+        with patch.dict(os.environ, {'HBNB_CHANGE_LOG': '1'}):
+            first, second = DBStorage(), DBStorage()
+        # both on the database of self.storage, as two processes would be
+        engine = self.storage._DBStorage__engine
+        for storage in (first, second):
+            storage._DBStorage__engine = engine
+            storage.reload()
+        states = []
+        for storage in (first, second, first, second):
+            state = State(name="Writer")
+            storage.new(state)
+            storage.save()
+            states.append(state.change_seq)
+        self.assertEqual(states, sorted(set(states)))
+        logged = [seq for seq, _, _, _ in first.changes_since(states[0] - 1)]
+        self.assertEqual(logged, states)
+
+    def test_migrate_adds_missing(self):
+        """Test that reload() restores a dropped column and index."""
+        from sqlalchemy import inspect, text
+        engine = self.storage._DBStorage__engine
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_amenities_change_seq"))
+            conn.execute(text("ALTER TABLE amenities DROP COLUMN change_seq"))
+        self.storage.reload()
+        inspector = inspect(engine)
+        self.assertIn("change_seq", {c['name'] for c in
+                                     inspector.get_columns("amenities")})
+        self.assertIn("ix_amenities_change_seq", {i['name'] for i in
+                                                  inspector.get_indexes(
+                                                      "amenities")})
+
+    def test_changes_since(self):
+        """Test that changes_since() replays logged session changes."""
+        from unittest.mock import patch
+        with patch.dict(os.environ, {'HBNB_CHANGE_LOG': '1'}):
+            storage = DBStorage()
+        cursor = max([seq for seq, _, _, _ in storage.changes_since()],
+                     default=0)
+        state = State(name="Fed")
+        storage.new(state)
+        storage.save()
+        state.name = "Refed"
+        storage.save()
+        storage.delete(state)
+        storage.save()
+        changes = list(storage.changes_since(cursor))
+        key = "State." + state.id
+        self.assertEqual([(op, k) for _, op, k, _ in changes],
+                         [("created", key), ("updated", key),
+                          ("deleted", key)])
+        self.assertEqual(list(storage.changes_since(changes[-1][0])), [])
+
+    def test_query(self):
+        """Test query() filters, orders and pages in SQL."""
+        state = State(name="Queried")
+        self.storage.new(state)
+        for name in ("Musanze", "Huye", "Rubavu", "Nyanza"):
+            self.storage.new(City(name=name, state_id=state.id))
+        self.storage.save()
+        query = self.storage.query(City).filter(
+            state_id=state.id, name__gte="I").order_by('-name')
+        self.assertEqual([c.name for c in query], ["Rubavu", "Nyanza",
+                                                   "Musanze"])
+        first = query.limit(2).all()
+        rest = query.after(first[-1]).all()
+        self.assertEqual([c.name for c in first + rest],
+                         ["Rubavu", "Nyanza", "Musanze"])
+        self.assertEqual(query.offset(1).first().name, "Nyanza")
+        self.assertEqual(self.storage.query(City).filter(
+            state_id=state.id, name__in=["Huye", "Nyanza"]).count(), 2)
+
+    def test_query_pages_nulls(self):
+        """Test keyset pages over a nullable column, both directions."""
+        state = State(name="Paged")
+        city = City(name="Paged", state_id=state.id)
+        user = User(email="paged@example.com", password="pwd")
+        for obj in (state, city, user):
+            self.storage.new(obj)
+        for name, latitude in (("A", 1.5), ("B", None), ("C", -2.0),
+                               ("D", None), ("E", 1.5)):
+            self.storage.new(Place(name=name, latitude=latitude,
+                                   city_id=city.id, user_id=user.id))
+        self.storage.save()
+        base = self.storage.query(Place).filter(city_id=city.id)
+        for order in ('latitude', '-latitude'):
+            query = base.order_by(order)
+            expected = [p.name for p in query]
+            self.assertEqual(len(expected), 5)
+            pages, page = [], query.limit(2).all()
+            while page:
+                pages += page
+                page = query.after(page[-1]).limit(2).all()
+            self.assertEqual([p.name for p in pages], expected, order)
+        self.assertIsNone(base.order_by('latitude').first().latitude)
+        self.assertIsNone(base.order_by('-latitude').all()[-1].latitude)
+
+    def test_query_count(self):
+        """Test that query().count() runs one COUNT without loading rows."""
+        state = State(name="Counted cities")
+        self.storage.new(state)
+        for name in ("Musanze", "Huye", "Rubavu"):
+            self.storage.new(City(name=name, state_id=state.id))
+        self.storage.save()
+        query = self.storage.query(City).filter(state_id=state.id,
+                                                name__gt="I")
+        counts = []
+        self.assertEqual(self.count_queries(
+            lambda: counts.append(query.count())), 1)
+        self.assertEqual(counts, [2])
+        self.assertEqual(query.limit(1).count(), 1)
+        self.assertEqual(query.offset(1).count(), 1)
+
+    def explain(self, sql):
+        """Returns the plan of sql as one lowercase string."""
+        from sqlalchemy import text
+        engine = self.storage._DBStorage__engine
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" \
+            else "EXPLAIN "
+        with engine.connect() as conn:
+            rows = conn.execute(text(prefix + sql)).all()
+        return " ".join(str(value) for row in rows for value in row).lower()
+
+    def test_indexes_used(self):
+        """Test that hot lookups and name orderings use an index."""
+        for sql, index in (
+                ("SELECT id FROM cities WHERE state_id = 'x' ORDER BY name",
+                 "ix_cities_state_id_name"),
+                ("SELECT id FROM places WHERE city_id = 'x'",
+                 "ix_places_city_id"),
+                ("SELECT id FROM places WHERE user_id = 'x'",
+                 "ix_places_user_id"),
+                ("SELECT id FROM reviews WHERE place_id = 'x'",
+                 "ix_reviews_place_id"),
+                ("SELECT name FROM amenities ORDER BY name",
+                 "ix_amenities_name"),
+                ("SELECT place_id FROM place_amenity WHERE amenity_id = 'x'",
+                 "ix_place_amenity_amenity_id_place_id")):
+            plan = self.explain(sql)
+            self.assertIn(index, plan, sql)
+            self.assertNotIn("filesort", plan, sql)
+            self.assertNotIn("temp b-tree", plan, sql)
+
+    def test_new_many(self):
+        """Test new_many() inserts in chunks and commits once."""
+        before = self.storage.count(Amenity)
+        amenities = (Amenity(name="Bulk {}".format(i)) for i in range(25))
+        with self.storage.batch():
+            count = self.storage.new_many(amenities)
+            self.assertEqual(count, 25)
+        self.assertEqual(self.storage.count(Amenity), before + 25)
+
     def test_new(self):
         """Test new() method."""
         state = State(name="California")
@@ -78,6 +283,60 @@ class TestDBStorage(unittest.TestCase):
         # Should not raise an error
         self.storage.reload()
 
+    def test_batch_commit(self):
+        """Test that saves inside batch() are committed on exit."""
+        with self.storage.batch():
+            state = State(name="Batch")
+            self.storage.new(state)
+            self.storage.save()
+        self.assertIn("State." + state.id, self.storage.all(State))
+
+    def test_batch_rollback(self):
+        """Test that an error inside batch() rolls back the session."""
+        state = State(name="Rolled back")
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.new(state)
+                self.storage.save()
+                raise RuntimeError
+        self.assertNotIn("State." + state.id, self.storage.all(State))
+
+    def count_queries(self, func):
+        """Return how many SQL statements func() runs."""
+        from sqlalchemy import event
+        engine = self.storage._DBStorage__engine
+        statements = []
+
+        def before_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", before_execute)
+        try:
+            func()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_execute)
+        return len(statements)
+
+    def test_all_eager_query_count(self):
+        """Test that eager loading makes rendering cost constant."""
+        for i in range(3):
+            state = State(name="State {}".format(i))
+            self.storage.new(state)
+            for j in range(2):
+                self.storage.new(City(name="City {}".format(j),
+                                      state_id=state.id))
+        self.storage.save()
+
+        def render(eager):
+            self.storage.close()
+            for state in self.storage.all(State, eager=eager).values():
+                [city.name for city in state.cities]
+        lazy = self.count_queries(lambda: render(()))
+        eager = self.count_queries(lambda: render(('cities',)))
+        joined = self.count_queries(lambda: render(('cities:joined',)))
+        self.assertGreaterEqual(lazy, 1 + 3)
+        self.assertEqual(eager, 2)
+        self.assertEqual(joined, 1)
+
     def test_state_creation(self):
         """Test creating a State object."""
         state = State(name="Texas")
@@ -3,7 +3,9 @@
 import unittest
 from models.base_model import BaseModel
 from models import storage
+import json
 import os
+import sys
 
 
 class test_fileStorage(unittest.TestCase):
@@ -107,8 +109,591 @@ class test_fileStorage(unittest.TestCase):
         expected_key = "BaseModel." + _id
         self.assertIn(expected_key, storage.all().keys())
 
+    def test_all_cls(self):
+        """ all(cls) only returns instances of cls and its subclasses """
+        from models.state import State
+        from models.city import City
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(list(storage.all(State)), ["State." + state.id])
+        self.assertEqual(len(storage.all(BaseModel)), 2)
+
+    def test_all_cls_after_direct_edit(self):
+        """ The class index follows edits made through all() """
+        from models.state import State
+        state = State()
+        storage.new(state)
+        del storage.all()["State." + state.id]
+        self.assertEqual(storage.all(State), {})
+
+    def test_lookup_foreign_key(self):
+        """ lookup() follows a foreign key change once it is saved """
+        from models.state import State
+        from models.city import City
+        old = State()
+        new = State()
+        city = City(state_id=old.id)
+        for obj in (old, new, city):
+            storage.new(obj)
+        self.assertEqual(old.cities, [city])
+        city.state_id = new.id
+        self.assertEqual(old.cities, [])
+        city.save()
+        self.assertEqual(new.cities, [city])
+        self.assertEqual(storage.lookup(City, 'state_id', old.id), {})
+
+    def test_lookup_unindexed(self):
+        """ lookup() on a plain attribute scans the class """
+        from models.state import State
+        state = State(name="Kigali")
+        storage.new(state)
+        found = storage.lookup(State, 'name', "Kigali")
+        self.assertEqual(list(found.values()), [state])
+
+    def test_amenity_membership(self):
+        """ Places and amenities resolve each other through amenity_ids """
+        from models.place import Place
+        from models.amenity import Amenity
+        wifi, pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        place, other = Place(), Place()
+        for obj in (wifi, pool, place, other):
+            storage.new(obj)
+        place.amenities = wifi
+        place.amenities = wifi
+        place.amenities = pool
+        other.amenities = pool
+        self.assertEqual(place.amenity_ids, [wifi.id, pool.id])
+        self.assertEqual(other.amenity_ids, [pool.id])
+        self.assertEqual(place.amenities, [wifi, pool])
+        place.save()
+        other.save()
+        self.assertEqual(wifi.place_amenities, [place])
+        self.assertEqual(len(storage.lookup(Place, 'amenity_ids', pool.id)),
+                         2)
+        storage.reload()
+        place = storage.get(Place, place.id)
+        self.assertEqual(place.amenity_ids, [wifi.id, pool.id])
+
+    def test_relationship_views(self):
+        """ Repeated reads reuse one lookup until storage changes """
+        from unittest.mock import patch
+        from models.state import State
+        from models.city import City
+        state = State()
+        storage.new(state)
+        city = City(state_id=state.id)
+        storage.new(city)
+        self.assertEqual(state.cities, [city])
+        with patch.object(storage, 'lookup') as lookup:
+            self.assertEqual(state.cities, [city])
+            self.assertEqual(state.cities, [city])
+        lookup.assert_not_called()
+        state.cities.clear()
+        self.assertEqual(state.cities, [city])
+        other = City(state_id=state.id)
+        storage.new(other)
+        self.assertEqual(len(state.cities), 2)
+        storage.delete(city)
+        self.assertEqual(state.cities, [other])
+
+    def test_change_seq(self):
+        """ new() stamps a store-wide sequence that survives reload """
+        first, second = BaseModel(), BaseModel()
+        first.save()
+        second.save()
+        self.assertGreater(second.change_seq, first.change_seq)
+        first.save()
+        self.assertGreater(first.change_seq, second.change_seq)
+        storage.reload()
+        later = BaseModel()
+        later.save()
+        self.assertGreater(later.change_seq, first.change_seq)
+
+    def test_batch_single_write(self):
+        """ Saves inside batch() are flushed once on exit """
+        with storage.batch():
+            for _ in range(3):
+                BaseModel().save()
+            self.assertFalse(os.path.exists('file.json'))
+        with open('file.json') as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_batch_rollback(self):
+        """ An error inside batch() restores the last saved state """
+        kept = BaseModel()
+        kept.save()
+        with self.assertRaises(RuntimeError):
+            with storage.batch():
+                BaseModel().save()
+                raise RuntimeError
+        self.assertEqual(list(storage.all()), ["BaseModel." + kept.id])
+
+    def test_batch_failed_flush(self):
+        """ A save failing on batch() exit restores the last saved state """
+        kept = BaseModel()
+        kept.save()
+        bad = BaseModel()
+        with self.assertRaises(AttributeError):
+            with storage.batch():
+                bad.created_at = 5
+                bad.save()
+        self.assertEqual(list(storage.all()), ["BaseModel." + kept.id])
+        BaseModel().save()
+        self.assertEqual(len(storage.all()), 2)
+
+    def test_get(self):
+        """ get() finds an object by class and id """
+        from models.state import State
+        state = State()
+        storage.new(state)
+        self.assertIs(storage.get(State, state.id), state)
+        self.assertIsNone(storage.get(State, "missing"))
+        self.assertIsNone(storage.get(BaseModel, state.id))
+
+    def test_count(self):
+        """ count() counts every object or those of one class """
+        from models.state import State
+        storage.new(State())
+        storage.new(BaseModel())
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.count(State), 1)
+        self.assertEqual(storage.count(BaseModel), 2)
+
     def test_storage_var_created(self):
         """ FileStorage object storage created """
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+
+class test_fileStorageQuery(unittest.TestCase):
+    """ Class to test storage.query() in file mode """
+
+    def setUp(self):
+        """ Store places in two cities """
+        from models.place import Place
+        storage.all().clear()
+        self.places = []
+        for i, (name, price) in enumerate([("Loft", 80), ("Hut", 20),
+                                           ("Villa", 300), ("Cabin", 80),
+                                           ("Barn", None)]):
+            place = Place(name=name, price_by_night=price,
+                          city_id="c1" if i % 2 == 0 else "c2")
+            storage.new(place)
+            self.places.append(place)
+
+    def tearDown(self):
+        """ Empty the store """
+        storage.all().clear()
+
+    def names(self, query):
+        """ Returns the names of the objects a query yields """
+        return [place.name for place in query]
+
+    def test_filter_order(self):
+        """ Filters combine with AND and order_by sorts """
+        from models.place import Place
+        query = storage.query(Place).filter(city_id="c1",
+                                            price_by_night__lte=100)
+        self.assertEqual(self.names(query.order_by('name')),
+                         ["Loft"])
+        self.assertEqual(self.names(storage.query(Place).filter(
+            price_by_night__in=(20, 300)).order_by('-name')),
+            ["Villa", "Hut"])
+        self.assertEqual(storage.query(Place).filter(
+            price_by_night=80).count(), 2)
+
+    def test_nulls_first(self):
+        """ None sorts before values, and after them descending """
+        from models.place import Place
+        query = storage.query(Place)
+        self.assertEqual(self.names(query.order_by('price_by_night'))[0],
+                         "Barn")
+        self.assertEqual(self.names(query.order_by('-price_by_night'))[-1],
+                         "Barn")
+
+    def test_pages(self):
+        """ Keyset pages and offset pages cover every row once """
+        from models.place import Place
+        query = storage.query(Place).order_by('-price_by_night', 'name')
+        expected = self.names(query)
+        self.assertEqual(expected, ["Villa", "Cabin", "Loft", "Hut", "Barn"])
+        pages, page = [], query.limit(2).all()
+        while page:
+            pages += page
+            page = query.after(page[-1]).limit(2).all()
+        self.assertEqual([place.name for place in pages], expected)
+        self.assertEqual(self.names(query.offset(2).limit(2)),
+                         expected[2:4])
+
+    def test_bad_lookup(self):
+        """ Unknown lookups are refused """
+        from models.place import Place
+        with self.assertRaises(ValueError):
+            storage.query(Place).filter(name__like="x")
+
+
+class test_fileStorageJournal(unittest.TestCase):
+    """ Class to test the journaled mode of file storage """
+
+    def setUp(self):
+        """ Set up a journaled storage on an empty store """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        with patch.dict(os.environ, {'HBNB_FILE_JOURNAL': '1',
+                                     'HBNB_FILE_JOURNAL_MAX': '100000'}):
+            self.storage = FileStorage()
+        self.tearDown()
+        self.storage.reload()
+
+    def tearDown(self):
+        """ Remove snapshot and journal """
+        for path in ('file.json', 'file.json.journal'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_save_appends(self):
+        """ Saves append to the journal instead of the snapshot """
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        self.assertFalse(os.path.exists('file.json'))
+        with open('file.json.journal') as f:
+            self.assertEqual(len(f.readlines()), 1)
+        other = BaseModel()
+        self.storage.new(other)
+        self.storage.save()
+        with open('file.json.journal') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_reload_replays(self):
+        """ Reload replays puts and deletes on top of the snapshot """
+        kept = BaseModel()
+        gone = BaseModel()
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        self.storage.delete(gone)
+        self.storage.reload()
+        self.assertIn("BaseModel." + kept.id, self.storage.all())
+        self.assertNotIn("BaseModel." + gone.id, self.storage.all())
+
+    def test_attribute_write_saved(self):
+        """ An attribute written after new() is journaled by save() """
+        from unittest.mock import patch
+        from models.state import State
+        new = State(name="A")
+        self.storage.new(new)
+        self.storage.save()
+        # models report changes to models.storage
+        with patch('models.storage', self.storage):
+            new.name = "B"
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, new.id).name, "B")
+
+    def test_torn_record_ignored(self):
+        """ A partial last record is skipped on reload """
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        with open('file.json.journal', 'a') as f:
+            f.write('{"key": "BaseModel.x", "val')
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["BaseModel." + new.id])
+
+    def test_compaction(self):
+        """ A large journal is folded into a fresh snapshot """
+        self.storage._FileStorage__journal_max = 1
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        self.assertTrue(os.path.exists('file.json'))
+        self.assertFalse(os.path.exists('file.json.journal'))
+        self.storage.reload()
+        self.assertIn("BaseModel." + new.id, self.storage.all())
+
+
+class test_fileStorageCache(unittest.TestCase):
+    """ Class to test the encoded member cache of file storage """
+
+    def setUp(self):
+        """ Set up a storage on an empty store """
+        from models.engine.file_storage import FileStorage
+        self.storage = FileStorage()
+        storage.all().clear()
+
+    @property
+    def members(self):
+        """ The cached encoded members, keyed like __objects """
+        return self.storage._FileStorage__members
+
+    def tearDown(self):
+        """ Remove storage file at end of tests """
+        storage.all().clear()
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def test_clean_objects_reused(self):
+        """ Saving twice serializes an unchanged object once """
+        from unittest.mock import patch
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        with patch.object(BaseModel, 'to_dict') as to_dict:
+            self.storage.save()
+        to_dict.assert_not_called()
+        with open('file.json') as f:
+            self.assertIn(new.storage_key, json.load(f))
+
+    def test_write_invalidates(self):
+        """ Assigning an attribute re-serializes the object on save """
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        self.assertIn(new.storage_key, self.members)
+        new.name = "changed"
+        self.assertNotIn(new.storage_key, self.members)
+        self.storage.save()
+        with open('file.json') as f:
+            self.assertEqual(json.load(f)[new.storage_key]['name'],
+                             "changed")
+
+    def test_batches_spliced(self):
+        """ Members split over several chunks still form one document """
+        objs = [BaseModel() for _ in range(5)]
+        for obj in objs:
+            self.storage.new(obj)
+        self.storage.save()
+        objs[2].save()
+        chunks = self.storage._FileStorage__snapshot_chunks(batch=2)
+        doc = json.loads(b''.join(chunks))
+        self.assertEqual(sorted(doc), sorted(o.storage_key for o in objs))
+        self.assertEqual(doc[objs[2].storage_key], objs[2].to_dict())
+
+    def test_cache_disabled(self):
+        """ HBNB_FILE_CACHE=0 keeps no encoded members """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        self.storage.reload()
+        with patch.dict(os.environ, {'HBNB_FILE_CACHE': '0'}):
+            uncached = FileStorage()
+        uncached.new(BaseModel())
+        uncached.save()
+        self.assertEqual(self.members, {})
+
+
+class test_fileStorageChanges(unittest.TestCase):
+    """ Class to test the change log of file storage """
+
+    def setUp(self):
+        """ Set up a logging storage on an empty store """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        with patch.dict(os.environ, {'HBNB_CHANGE_LOG': '1'}):
+            self.storage = FileStorage()
+        self.tearDown()
+        self.storage.reload()
+
+    def tearDown(self):
+        """ Remove snapshot and change log """
+        for path in ('file.json', 'file.json.changes'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_feed(self):
+        """ Saved creates, updates and deletes come back in order """
+        kept, gone = BaseModel(), BaseModel()
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        self.storage.new(kept)
+        self.storage.delete(gone)
+        changes = list(self.storage.changes_since())
+        self.assertEqual([(op, key) for _, op, key, _ in changes],
+                         [("created", kept.storage_key),
+                          ("created", gone.storage_key),
+                          ("updated", kept.storage_key),
+                          ("deleted", gone.storage_key)])
+        self.assertIs(changes[0][3], kept)
+        self.assertIsNone(changes[3][3])
+        cursor = changes[1][0]
+        self.assertEqual([change[0] for change in
+                          self.storage.changes_since(cursor)],
+                         [change[0] for change in changes[2:]])
+
+    def test_unsaved_not_logged(self):
+        """ Changes only reach the feed once saved """
+        self.storage.new(BaseModel())
+        self.assertEqual(list(self.storage.changes_since()), [])
+
+    def test_cursor_search(self):
+        """ Any cursor finds the first newer line of a long log """
+        with self.storage.batch():
+            for _ in range(50):
+                self.storage.new(BaseModel())
+        seqs = [change[0] for change in self.storage.changes_since()]
+        self.assertEqual(len(seqs), 50)
+        for cursor in range(seqs[0] - 1, seqs[-1] + 1):
+            found = [change[0] for change in
+                     self.storage.changes_since(cursor)]
+            self.assertEqual(found, [seq for seq in seqs if seq > cursor])
+
+    def test_seq_resumes_after_delete(self):
+        """ Sequence numbers stay increasing across reload """
+        obj = BaseModel()
+        self.storage.new(obj)
+        self.storage.delete(obj)
+        last = list(self.storage.changes_since())[-1][0]
+        self.storage.reload()
+        other = BaseModel()
+        self.storage.new(other)
+        self.assertGreater(other.change_seq, last)
+
+
+class test_fileStorageStreaming(unittest.TestCase):
+    """ Class to test the streaming and lazy reload of file storage """
+
+    def setUp(self):
+        """ Save one State and one City to an empty store """
+        from models.state import State
+        from models.city import City
+        storage.all().clear()
+        self.state = State(name="Kigali")
+        self.city = City(name="Nyarugenge", state_id=self.state.id)
+        storage.new(self.state)
+        storage.new(self.city)
+        storage.save()
+
+    def tearDown(self):
+        """ Remove storage file at end of tests """
+        storage.all().clear()
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def test_chunked_items(self):
+        """ Members are decoded across chunk boundaries """
+        import io
+        from models.engine.serializers import _iter_json_items
+        doc = {"a": {"s": "}{\",", "l": [1, {"b": 2}]}, "c d": {}}
+        text = json.dumps(doc, indent=2)
+        for size in (1, 3, 64):
+            items = _iter_json_items(io.StringIO(text), size)
+            self.assertEqual(dict(items), doc)
+
+    def test_reload_indented(self):
+        """ A pretty-printed file reloads the same objects """
+        with open('file.json') as f:
+            doc = json.load(f)
+        with open('file.json', 'w') as f:
+            json.dump(doc, f, indent=4)
+        storage.reload()
+        self.assertEqual(set(storage.all()), set(doc))
+
+    def test_reload_trailing_data(self):
+        """ Garbage after the object is rejected """
+        with open('file.json', 'a') as f:
+            f.write(' {}')
+        with self.assertRaises(ValueError):
+            storage.reload()
+
+    def test_lazy_reload(self):
+        """ Lazy mode only builds the classes that are read """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        from models.city import City
+        with patch.dict(os.environ, {'HBNB_FILE_LAZY': '1'}):
+            lazy = FileStorage()
+        lazy.reload()
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+        states = lazy.all(State)
+        self.assertEqual(list(states), ["State." + self.state.id])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 1)
+        self.assertEqual(len(states["State." + self.state.id].cities), 1)
+        lazy.save()
+        lazy.reload()
+        self.assertEqual(len(lazy.all()), 2)
+
+    def test_compact_reload(self):
+        """ Compact records round-trip and build models on demand """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        from models.city import City
+        with patch.dict(os.environ, {'HBNB_FILE_COMPACT': '1'}):
+            compact = FileStorage()
+        compact.reload()
+        raw = FileStorage._FileStorage__raw[City]["City." + self.city.id]
+        self.assertIs(type(raw), tuple)
+        self.assertIs(raw[raw[-1].index('state_id')],
+                      sys.intern(self.state.id))
+        compact.save()
+        compact.reload()
+        self.assertEqual(compact.count(), 2)
+        city = compact.get(City, self.city.id)
+        self.assertEqual(city.to_dict(), self.city.to_dict())
+        self.assertEqual(len(FileStorage._FileStorage__objects), 1)
+
+
+class test_fileStorageChecksum(unittest.TestCase):
+    """ Class to test atomic and checksummed snapshots """
+
+    paths = ('file.json', 'file.json.sha256',
+             'file.json.bak', 'file.json.bak.sha256')
+
+    def setUp(self):
+        """ Set up a checksumming storage on an empty store """
+        from unittest.mock import patch
+        from models.engine.file_storage import FileStorage
+        with patch.dict(os.environ, {'HBNB_FILE_CHECKSUM': '1'}):
+            self.storage = FileStorage()
+        self.tearDown()
+        self.storage.reload()
+
+    def tearDown(self):
+        """ Remove snapshots and digests """
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_no_temp_files(self):
+        """ Only the snapshot, its backup and digests are left behind """
+        for _ in range(2):
+            self.storage.new(BaseModel())
+            self.storage.save()
+        leftovers = [name for name in os.listdir('.')
+                     if name.startswith('file.json')]
+        self.assertEqual(sorted(leftovers), sorted(self.paths))
+
+    def test_fallback_to_backup(self):
+        """ A corrupt snapshot is replaced by the previous one """
+        first = BaseModel()
+        self.storage.new(first)
+        self.storage.save()
+        self.storage.new(BaseModel())
+        self.storage.save()
+        with open('file.json', 'r+') as f:
+            f.truncate(10)
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["BaseModel." + first.id])
+
+    def test_mismatch_without_backup(self):
+        """ A snapshot failing its digest with no backup raises """
+        self.storage.new(BaseModel())
+        self.storage.save()
+        with open('file.json.sha256', 'w') as f:
+            f.write('0' * 64)
+        with self.assertRaises(ValueError):
+            self.storage.reload()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Unit tests for the FileStorage serializers."""
+import importlib.util
+import io
+import os
+import unittest
+from unittest import skipIf
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.engine.serializers import (get_serializer, serializer_for,
+                                       JSONSerializer)
+from models.place import Place
+from models.state import State
+
+
+class TestSerializers(unittest.TestCase):
+    """Test cases for each on-disk format."""
+
+    def setUp(self):
+        """Set up an empty store with one State and one Place."""
+        FileStorage._FileStorage__objects = {}
+        self.tearDown()
+        self.state = State(name="Kigali")
+        self.place = Place(name="Loft", latitude=1.5, number_rooms=3)
+
+    def tearDown(self):
+        """Remove the storage file."""
+        if os.path.exists('file.json'):
+            os.remove('file.json')
+
+    def round_trip(self, name):
+        """Saves and reloads the store with the serializer called name."""
+        with patch.dict(os.environ, {'HBNB_FILE_FORMAT': name}):
+            storage = FileStorage()
+        storage.new(self.state)
+        storage.new(self.place)
+        storage.save()
+        storage.reload()
+        return storage
+
+    def check_round_trip(self, name):
+        """Reloaded objects match the saved ones."""
+        storage = self.round_trip(name)
+        for obj in (self.state, self.place):
+            key = type(obj).__name__ + "." + obj.id
+            self.assertEqual(storage.all()[key].to_dict(), obj.to_dict())
+
+    def test_json(self):
+        """Test the default json format."""
+        self.check_round_trip('json')
+
+    @skipIf(importlib.util.find_spec('orjson') is None, "orjson missing")
+    def test_orjson(self):
+        """Test the orjson format."""
+        self.check_round_trip('orjson')
+
+    @skipIf(importlib.util.find_spec('msgpack') is None, "msgpack missing")
+    def test_msgpack(self):
+        """Test the msgpack format and reading it back as another format."""
+        self.check_round_trip('msgpack')
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(len(storage.all()), 2)
+
+    @skipIf(importlib.util.find_spec('msgpack') is None, "msgpack missing")
+    def test_msgpack_truncated(self):
+        """Test that a truncated msgpack file raises ValueError."""
+        self.round_trip('msgpack')
+        with open('file.json', 'r+b') as f:
+            f.truncate(os.path.getsize('file.json') - 5)
+        with self.assertRaises(ValueError):
+            FileStorage().reload()
+
+    def test_unknown_format(self):
+        """Test that an unknown format name is rejected."""
+        with self.assertRaises(ValueError):
+            get_serializer('yaml')
+
+    def test_sniff_json(self):
+        """Test that JSON files are detected from their first byte."""
+        f = io.BufferedReader(io.BytesIO(b'{}'))
+        self.assertIsInstance(serializer_for(f), JSONSerializer)
+        self.assertEqual(list(serializer_for(f).load(f)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,8 +21,8 @@ def close_db(error):
 @app.route('/hbnb_filters', strict_slashes=False)
 def hbnb_filters():
     """Display HTML page with HBNB filters"""
-    states = sorted(storage.all(State).values(), key=lambda x: x.name)
-    amenities = sorted(storage.all(Amenity).values(), key=lambda x: x.name)
+    states = storage.query(State).eager('cities').order_by('name').all()
+    amenities = storage.query(Amenity).order_by('name').all()
     return render_template('10-hbnb_filters.html', states=states, amenities=amenities)
 
 
@@ -20,7 +20,7 @@ def close_db(error):
 @app.route('/cities_by_states', strict_slashes=False)
 def cities_by_states():
     """Display HTML page with list of states and their cities"""
-    states = storage.all(State).values()
+    states = storage.all(State, eager=('cities',)).values()
     return render_template('8-cities_by_states.html', states=states)
 
 
@@ -28,11 +28,7 @@ def states():
 @app.route('/states/<id>', strict_slashes=False)
 def states_id(id):
     """Display HTML page with a specific state and its cities"""
-    state = None
-    for s in storage.all(State).values():
-        if s.id == id:
-            state = s
-            break
+    state = storage.get(State, id)
     return render_template('9-states.html', state=state)
 
 